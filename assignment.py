@@ -0,0 +1,81 @@
+"""
+Capacity-constrained global mentor assignment.
+
+Independent per-mentee KNN lets popular mentors be recommended to everyone.
+This module assigns every mentee to at most one mentor so that no mentor
+takes more than its capacity, maximising the total match score over a
+sparsified candidate graph (the top-K neighbor lists from
+MentorMatcher.match_all_mentees) rather than a dense mentee x mentor matrix.
+
+The capacitated problem is reduced to a rectangular assignment: each mentor
+is expanded into as many slots as it can take (capped by its candidate
+count) and every mentee gets a private "unassigned" slot with score 0, so a
+full matching always exists. The sparse LAPJV solver in scipy then solves it
+exactly on the candidate edges.
+"""
+import logging
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy.sparse.csgraph import min_weight_full_bipartite_matching
+
+# Costs are (COST_OFFSET - score) so that every edge, including a perfect
+# 100% match and the unassigned slot (score 0), has a strictly positive weight.
+COST_OFFSET = 101.0
+
+logger = logging.getLogger(__name__)
+
+
+def assign_mentors(candidates, capacity):
+    """
+    Assign mentees to mentors maximising the total score under mentor capacities.
+
+    candidates: DataFrame with mentee_id, mentor_id and score columns, e.g. the
+        output of MentorMatcher.match_all_mentees(k).
+    capacity: maximum mentees per mentor, either an int for all mentors or a
+        mapping of mentor_id -> int (mentors missing from it get 0).
+
+    Returns a DataFrame with mentee_id, mentor_id and score for every assigned
+    mentee; mentees with no free candidate mentor are left out.
+    """
+    candidates = candidates.drop_duplicates(["mentee_id", "mentor_id"])
+    mentee_codes, mentee_ids = pd.factorize(candidates["mentee_id"])
+    mentor_codes, mentor_ids = pd.factorize(candidates["mentor_id"])
+    scores = candidates["score"].to_numpy(dtype=float)
+    n_mentees = len(mentee_ids)
+    logger.info("Assigning %d mentees over %d candidate edges", n_mentees, len(candidates))
+
+    if isinstance(capacity, dict):
+        caps = np.array([capacity.get(m, 0) for m in mentor_ids], dtype=np.int64)
+    else:
+        caps = np.full(len(mentor_ids), int(capacity), dtype=np.int64)
+    # A mentor never needs more slots than it has candidate mentees.
+    slots = np.minimum(caps, np.bincount(mentor_codes, minlength=len(mentor_ids)))
+    slot_offsets = np.concatenate([[0], np.cumsum(slots)])
+    n_slots = slot_offsets[-1]
+
+    # Replicate every candidate edge once per slot of its mentor.
+    repeats = slots[mentor_codes]
+    edge_rows = np.repeat(mentee_codes, repeats)
+    edge_starts = np.repeat(np.cumsum(repeats) - repeats, repeats)
+    edge_cols = np.repeat(slot_offsets[mentor_codes], repeats) + np.arange(len(edge_rows)) - edge_starts
+    edge_costs = np.repeat(COST_OFFSET - scores, repeats)
+
+    # Private unassigned slot per mentee, after the mentor slots.
+    rows = np.concatenate([edge_rows, np.arange(n_mentees)])
+    cols = np.concatenate([edge_cols, n_slots + np.arange(n_mentees)])
+    costs = np.concatenate([edge_costs, np.full(n_mentees, COST_OFFSET)])
+    graph = sp.csr_matrix((costs, (rows, cols)), shape=(n_mentees, n_slots + n_mentees))
+
+    row_ind, col_ind = min_weight_full_bipartite_matching(graph)
+    assigned = col_ind < n_slots
+    row_ind, col_ind = row_ind[assigned], col_ind[assigned]
+    slot_mentor = np.repeat(np.arange(len(mentor_ids)), slots)
+    result = pd.DataFrame({
+        "mentee_id": np.asarray(mentee_ids)[row_ind],
+        "mentor_id": np.asarray(mentor_ids)[slot_mentor[col_ind]],
+        "score": COST_OFFSET - np.asarray(graph[row_ind, col_ind]).ravel(),
+    })
+    logger.info("Assigned %d mentees; %d left unassigned", len(result), n_mentees - len(result))
+    return result
@@ -0,0 +1,323 @@
+"""
+Asyncio matching service: warm matcher, micro-batched lookups, background writes.
+
+Endpoints (HTTP/1.1, keep-alive, JSON responses):
+  GET /match/<mentee_id>[?k=5]   top-k mentors with their profiles and score breakdowns
+  GET /match/<mentee_id>/chart.png  bar chart of those matches (opt-in artifact)
+  GET /health                    liveness and matcher size
+  GET /metrics                   request, batching, writer and stage-timing metrics
+                                 (Prometheus text format; /metrics.json for JSON)
+
+The matcher is loaded once (warm from the disk cache when present) and kept
+in memory; a background task syncs changed (and drops deleted) rows every `sync_interval`
+seconds. Concurrent lookups are coalesced: identical in-flight requests share
+one result, and everything that arrives within `max_wait` seconds is answered
+by one read of the matcher's top-k table (rows not filled yet take a single
+vectorized kneighbors call) plus one profile fetch per table.
+Match rows are handed to a background writer queue, so a response never
+waits for the database insert.
+
+Run against Supabase with ``python async_service.py`` (SUPABASE_URL /
+SUPABASE_KEY set), or see benchmarks/load_test.py for a stub database.
+"""
+import asyncio
+import collections
+import json
+import logging
+import os
+import time
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+import matching_service
+from instrumentation import configure_logging, metrics, render_prometheus
+from match_store import SupabaseMatchStore, match_rows
+
+HOST = os.environ.get("MATCHER_HOST", "127.0.0.1")
+PORT = int(os.environ.get("MATCHER_PORT", "8080"))
+SYNC_INTERVAL = float(os.environ.get("MATCHER_SYNC_INTERVAL", "30"))
+MAX_BATCH = int(os.environ.get("MATCHER_MAX_BATCH", "64"))
+MAX_WAIT = float(os.environ.get("MATCHER_MAX_WAIT", "0.002"))
+# Recent request latencies kept for the p50 / p99 in /metrics
+LATENCY_WINDOW = 2048
+
+logger = logging.getLogger(__name__)
+
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 500: "Internal Server Error"}
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Unserializable value: {value!r}")
+
+
+def _parse_id(text):
+    """Path ids are integers when they look like one, strings (e.g. UUIDs) otherwise."""
+    return int(text) if text.isdigit() else text
+
+
+class MatchingService:
+    """Warm matcher behind a micro-batching request queue and a background match writer."""
+
+    def __init__(self, client=None, store=None, k=5, max_batch=MAX_BATCH, max_wait=MAX_WAIT,
+                 sync_interval=SYNC_INTERVAL, chart_renderer=None):
+        self.client = client or matching_service.get_client()
+        self.store = store or SupabaseMatchStore(self.client)
+        self.chart_renderer = chart_renderer or matching_service.chart_renderer
+        self.k = k
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.sync_interval = sync_interval
+        self.matcher = None
+        self.metrics = collections.Counter()
+        self.latencies = collections.deque(maxlen=LATENCY_WINDOW)
+        self.started_at = None
+        self._lookups = None
+        self._writes = None
+        self._pending = {}
+        self._tasks = []
+        self._server = None
+        self._connections = set()
+
+    async def start(self, host=HOST, port=PORT):
+        """Sync the matcher, start the background tasks and listen; returns the bound port."""
+        self._lookups = asyncio.Queue()
+        self._writes = asyncio.Queue()
+        await self.sync()
+        self._tasks = [asyncio.create_task(self._batch_loop()), asyncio.create_task(self._writer_loop())]
+        if self.sync_interval:
+            self._tasks.append(asyncio.create_task(self._sync_loop()))
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        self.started_at = time.time()
+        port = self._server.sockets[0].getsockname()[1]
+        logger.info("Matching service listening on %s:%d", host, port)
+        return port
+
+    async def stop(self):
+        """Stop accepting requests, flush the writer queue, cancel background tasks and save the matcher."""
+        if self._server is not None:
+            self._server.close()
+            for writer in list(self._connections):
+                writer.close()
+            await self._server.wait_closed()
+        await self._writes.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await asyncio.to_thread(matching_service.flush_matcher)
+        self.chart_renderer.shutdown()
+        logger.info("Matching service stopped")
+
+    async def sync(self):
+        """Pull changed rows into the matcher; lookups only wait while a fetched page is applied."""
+        self.matcher = await asyncio.to_thread(matching_service.sync_matcher, False, self.client)
+        self.metrics["syncs_total"] += 1
+
+    async def match(self, mentee_id, k=None):
+        """Top-k matches for one mentee; concurrent identical lookups share one result."""
+        key = (mentee_id, k or self.k)
+        self.metrics["lookups_total"] += 1
+        if key in self._pending:
+            self.metrics["coalesced_total"] += 1
+            return await asyncio.shield(self._pending[key])
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        self._lookups.put_nowait(key)
+        result = await asyncio.shield(future)
+        # Only the first of the coalesced requests queues the match rows
+        self._writes.put_nowait(match_rows(mentee_id, result["matches"]))
+        return result
+
+    def health(self):
+        fitted = self.matcher is not None and self.matcher.is_fitted
+        return {
+            "status": "ok" if fitted else "starting",
+            "mentees": len(self.matcher.mentee_ids) if fitted else 0,
+            "mentors": len(self.matcher.mentor_ids) if fitted else 0,
+            "uptime_seconds": time.time() - self.started_at if self.started_at else 0.0,
+        }
+
+    def metrics_snapshot(self):
+        snapshot = dict(self.metrics)
+        snapshot["lookup_queue_depth"] = self._lookups.qsize()
+        snapshot["write_queue_depth"] = self._writes.qsize()
+        if self.metrics["batches_total"]:
+            snapshot["mean_batch_size"] = self.metrics["batched_lookups_total"] / self.metrics["batches_total"]
+        if self.latencies:
+            p50, p99 = np.percentile(list(self.latencies), [50, 99])
+            snapshot["latency_p50_ms"] = p50 * 1000
+            snapshot["latency_p99_ms"] = p99 * 1000
+        return snapshot
+
+    async def _batch_loop(self):
+        while True:
+            batch = [await self._lookups.get()]
+            if self._lookups.empty():
+                # Give concurrent requests a moment to join this batch
+                await asyncio.sleep(self.max_wait)
+            while len(batch) < self.max_batch and not self._lookups.empty():
+                batch.append(self._lookups.get_nowait())
+            try:
+                results = await asyncio.to_thread(self._answer_batch, batch)
+            except Exception as e:  # noqa: BLE001 - every waiter must be released
+                logger.exception("Batch of %d lookups failed", len(batch))
+                results = {key: e for key in batch}
+            for key in batch:
+                future = self._pending.pop(key)
+                if future.done():
+                    continue
+                if isinstance(results[key], Exception):
+                    future.set_exception(results[key])
+                else:
+                    future.set_result(results[key])
+            self.metrics["batches_total"] += 1
+            self.metrics["batched_lookups_total"] += len(batch)
+            self.metrics["max_batch_size"] = max(self.metrics["max_batch_size"], len(batch))
+
+    def _answer_batch(self, batch):
+        """One top-k lookup, one score breakdown pass and one profile fetch per table for a batch of keys."""
+        if not all(self.matcher.has_mentee(mentee_id) for mentee_id, _ in batch):
+            # Mentees created since the last sync: catch up once before answering 404
+            self.matcher = matching_service.sync_matcher(False, self.client, reconcile=False)
+        matcher = self.matcher
+        # Syncs and timed saves of the matcher run on other threads
+        with matching_service.matcher_lock:
+            results = {key: KeyError(f"Unknown mentee id: {key[0]!r}")
+                       for key in batch if not matcher.has_mentee(key[0])}
+            known = [key for key in batch if key not in results]
+            if not known:
+                return results
+            k = max(key[1] for key in known)
+            matches = matcher.match_many([mentee_id for mentee_id, _ in known], k)
+            pairs = [(key[0], mentor_id) for key, (ids, _) in zip(known, matches) for mentor_id in ids[:key[1]]]
+            breakdowns = iter(matching_service.score_breakdowns(
+                matcher, [mentee_id for mentee_id, _ in pairs], [mentor_id for _, mentor_id in pairs]))
+        mentor_ids = {mentor_id for ids, _ in matches for mentor_id in ids}
+        mentees = matching_service.fetch_profiles("mentees", [mentee_id for mentee_id, _ in known], self.client)
+        mentors = matching_service.fetch_profiles("mentors", mentor_ids, self.client)
+        for key, (ids, scores) in zip(known, matches):
+            results[key] = {
+                "mentee": mentees.get(key[0]),
+                "matches": matching_service.match_dicts(
+                    ids[:key[1]], scores[:key[1]], [next(breakdowns) for _ in ids[:key[1]]], mentors),
+            }
+        return results
+
+    async def _writer_loop(self):
+        """Drain queued match rows into the store in chunked upserts, off the request path."""
+        while True:
+            rows = [await self._writes.get()]
+            while not self._writes.empty():
+                rows.append(self._writes.get_nowait())
+            flat = [row for chunk in rows for row in chunk]
+            try:
+                await asyncio.to_thread(self.store.save_matches, flat)
+                self.metrics["match_rows_written_total"] += len(flat)
+            except Exception:  # noqa: BLE001 - keep the writer alive
+                self.metrics["write_errors_total"] += 1
+                logger.exception("Failed to write %d match rows", len(flat))
+            for _ in rows:
+                self._writes.task_done()
+
+    async def _sync_loop(self):
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                await self.sync()
+            except Exception:  # noqa: BLE001 - retry on the next tick
+                self.metrics["sync_errors_total"] += 1
+                logger.exception("Matcher sync failed")
+
+    async def _handle_connection(self, reader, writer):
+        self._connections.add(writer)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                if int(headers.get("content-length", 0)):
+                    await reader.readexactly(int(headers["content-length"]))
+                method, target, version = (request_line.decode("latin-1").split() + ["", "", ""])[:3]
+                status, body = await self._route(method, target)
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                if isinstance(body, bytes):
+                    payload, content_type = body, "image/png"
+                elif isinstance(body, str):
+                    payload, content_type = body.encode(), "text/plain; version=0.0.4"
+                else:
+                    payload, content_type = json.dumps(body, default=_json_default).encode(), "application/json"
+                writer.write(
+                    f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n"
+                    f"Content-Type: {content_type}\r\nContent-Length: {len(payload)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._connections.discard(writer)
+            writer.close()
+
+    async def _route(self, method, target):
+        url = urlsplit(target)
+        if method != "GET":
+            return 400, {"error": f"Unsupported method {method}"}
+        if url.path == "/health":
+            return 200, self.health()
+        if url.path == "/metrics":
+            return 200, render_prometheus(self.metrics_snapshot())
+        if url.path == "/metrics.json":
+            return 200, {**self.metrics_snapshot(), "stages": metrics.snapshot()}
+        if url.path.startswith("/match/"):
+            start = time.perf_counter()
+            self.metrics["requests_total"] += 1
+            mentee_path, _, artifact = url.path[len("/match/"):].partition("/")
+            if artifact not in ("", "chart.png"):
+                return 404, {"error": f"No route for {url.path}"}
+            try:
+                query = parse_qs(url.query)
+                k = int(query["k"][0]) if "k" in query else self.k
+                if k < 1:
+                    raise ValueError(f"k must be at least 1, got {k}")
+                mentee_id = _parse_id(mentee_path)
+                result = await self.match(mentee_id, k)
+                if artifact:
+                    self.metrics["charts_total"] += 1
+                    # Rendered in the renderer's worker pool; the event loop only awaits it
+                    result = await asyncio.wrap_future(self.chart_renderer.submit(
+                        (result["mentee"] or {}).get("name", str(mentee_id)), result["matches"]))
+            except KeyError as e:
+                self.metrics["not_found_total"] += 1
+                return 404, {"error": e.args[0]}
+            except ValueError as e:
+                return 400, {"error": str(e)}
+            except Exception as e:  # noqa: BLE001 - report, keep serving
+                self.metrics["errors_total"] += 1
+                return 500, {"error": str(e)}
+            self.latencies.append(time.perf_counter() - start)
+            return 200, result
+        return 404, {"error": f"No route for {url.path}"}
+
+
+async def main():
+    service = MatchingService()
+    await service.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await service.stop()
+
+
+if __name__ == "__main__":
+    configure_logging()
+    asyncio.run(main())
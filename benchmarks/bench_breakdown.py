@@ -0,0 +1,67 @@
+"""
+Benchmark the per-block score breakdown and query-time block weights.
+
+Fits a matcher on synthetic mentees and mentors (see
+synthetic.synthetic_profiles) and times MentorMatcher.match_all_mentees
+plain, with explain=True, and with `--weights` overrides plus explain.
+After one warm-up pass of every variant, the variants run interleaved for
+`--repeats` rounds; each variant's median, min and max are reported along
+with the overhead of its median over the plain one. It also checks that
+every breakdown adds up with its score to 100.
+
+Usage: python benchmarks/bench_breakdown.py [--mentees 100000] [--mentors 100000]
+           [--k 5] [--weights field=0.1 skills=0.4] [--repeats 5]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mentor_matcher import COST_COLUMNS, MentorMatcher  # noqa: E402
+from preprocessing import CSV_MENTOR_COLUMNS  # noqa: E402
+from synthetic import bundled_vocabularies, synthetic_profiles  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mentees", type=int, default=100_000)
+    parser.add_argument("--mentors", type=int, default=100_000)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--weights", nargs="+", default=["field=0.1", "skills=0.4"], help="block=weight overrides")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+    weights = {block: float(weight) for block, weight in (item.split("=") for item in args.weights)}
+
+    vocabularies = bundled_vocabularies()
+    matcher = MentorMatcher(CSV_MENTOR_COLUMNS, CSV_MENTOR_COLUMNS).fit(
+        synthetic_profiles(args.mentees, vocabularies, seed=1), synthetic_profiles(args.mentors, vocabularies))
+    print(f"{args.mentees} mentees x {args.mentors} mentors, k={args.k}, {args.repeats} repeats after a warm-up")
+    runs = {"plain": {}, "explain": {"explain": True}, "weights+explain": {"explain": True, "weights": weights}}
+    sums = {}
+    for name, options in runs.items():
+        result = matcher.match_all_mentees(args.k, **options)
+        sums[name] = "-"
+        if options.get("explain"):
+            sums[name] = str(bool(np.allclose(result["score"] + result[COST_COLUMNS].sum(axis=1), 100)))
+    times = {name: [] for name in runs}
+    for _ in range(args.repeats):
+        for name, options in runs.items():
+            start = time.perf_counter()
+            matcher.match_all_mentees(args.k, **options)
+            times[name].append(time.perf_counter() - start)
+    baseline = statistics.median(times["plain"])
+    print(f"{'run':>16} {'median s':>9} {'min s':>7} {'max s':>7} {'overhead':>9} {'sums to 100':>12}")
+    for name, elapsed in times.items():
+        median = statistics.median(elapsed)
+        print(f"{name:>16} {median:9.2f} {min(elapsed):7.2f} {max(elapsed):7.2f} "
+              f"{median / baseline - 1:8.1%} {sums[name]:>12}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Track the cold-start cost of importing the service modules.
+
+Each module is imported `--repeat` times in a fresh interpreter under
+``python -X importtime``; the report gives the median cumulative import time,
+the heaviest top-level dependencies and whether any of the deferred packages
+(sklearn, matplotlib, supabase) were pulled in at import. Exits non-zero when
+a module is over its budget or imports a deferred package, so the check can
+run in CI.
+
+Usage: python benchmarks/bench_importtime.py [--modules matching_service ...]
+           [--budget-ms 1000] [--repeat 5] [--top 5]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = ["matching_service", "async_service", "enhanced_matching", "mentor_matcher", "visualization", "db_client"]
+# Packages that must only be imported when first used
+DEFERRED = ("sklearn", "matplotlib", "supabase")
+
+
+def import_times(module):
+    """{imported module: (self us, cumulative us, nesting depth)} for one cold import of module."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        times[name.strip()] = (int(self_us), int(cumulative_us), depth)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modules", nargs="+", default=MODULES)
+    parser.add_argument("--budget-ms", type=float, default=1000.0, help="cold import budget per module")
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per module")
+    parser.add_argument("--top", type=int, default=5, help="heaviest dependencies to list")
+    args = parser.parse_args()
+
+    failures = []
+    print(f"{'module':>18} {'median ms':>10} {'budget':>8}  heaviest imports")
+    for module in args.modules:
+        runs = [import_times(module) for _ in range(args.repeat)]
+        total_ms = statistics.median(run[module][1] for run in runs) / 1000
+        last = runs[-1]
+        heaviest = sorted((name for name, (_, _, depth) in last.items() if depth == 1 and name != module),
+                          key=lambda name: -last[name][1])[:args.top]
+        deferred = sorted({name.split(".")[0] for name in last} & set(DEFERRED))
+        status = "ok" if total_ms <= args.budget_ms else "OVER"
+        print(f"{module:>18} {total_ms:>10.1f} {status:>8}  "
+              + ", ".join(f"{name} {last[name][1] / 1000:.0f}ms" for name in heaviest))
+        if total_ms > args.budget_ms:
+            failures.append(f"{module} took {total_ms:.0f}ms (budget {args.budget_ms:.0f}ms)")
+        if deferred:
+            failures.append(f"{module} imports {', '.join(deferred)} at import time")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Benchmark the neighbor index backends: build time, query latency, recall@k
+and the bytes each backend holds per mentor row.
+
+Mentor populations are synthetic (see synthetic.synthetic_profiles): fields,
+countries, languages, skills and interests are drawn with Zipf-like weights
+from the vocabularies of the bundled CSVs, so the feature layout matches
+production. Queries are separate synthetic mentees, answered one at a time.
+
+Recall@k is distance based: a returned mentor counts as a hit when its
+distance is within the exact k-th nearest distance, so ties between
+identical profiles are not counted as misses.
+
+Usage: python benchmarks/bench_index.py [--sizes 10000 100000 1000000]
+           [--backends brute ball_tree lsh packed] [--queries 200] [--k 5]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from neighbor_index import INDEX_BACKENDS, make_index  # noqa: E402
+from preprocessing import CSV_MENTOR_COLUMNS, encode_profiles  # noqa: E402
+from synthetic import bundled_vocabularies, synthetic_profiles  # noqa: E402
+
+# Densifying backends are skipped above this many bytes of dense rows.
+MAX_DENSE_BYTES = 2 * 2**30
+
+
+def recall_at_k(distances, exact_distances):
+    """Share of returned neighbors within the exact k-th nearest distance."""
+    return float(np.mean(distances <= exact_distances[:, -1:] + 1e-9))
+
+
+def bench_backend(backend, mentors, queries, k, columns):
+    start = time.perf_counter()
+    index = make_index(mentors, backend, k, columns)
+    # Lazily built structures (the ball tree, LSH bucket order) count as build time
+    index.kneighbors(queries[0], n_neighbors=k)
+    build_time = time.perf_counter() - start
+    latencies = np.empty(queries.shape[0])
+    distances = np.empty((queries.shape[0], k))
+    for i in range(queries.shape[0]):
+        start = time.perf_counter()
+        distances[i] = index.kneighbors(queries[i], n_neighbors=k)[0][0]
+        latencies[i] = time.perf_counter() - start
+    return build_time, latencies, distances, index.nbytes / index.size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000], help="mentor counts")
+    parser.add_argument("--backends", nargs="+", default=list(INDEX_BACKENDS), choices=list(INDEX_BACKENDS))
+    parser.add_argument("--queries", type=int, default=200, help="single-mentee queries per run")
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+
+    vocabularies = bundled_vocabularies()
+    print(f"{'mentors':>9} {'backend':>9} {'build s':>8} {'p50 ms':>8} {'p99 ms':>8} {'recall@k':>9} {'B/row':>7}")
+    for n_mentors in args.sizes:
+        columns, queries, mentors = encode_profiles(
+            synthetic_profiles(args.queries, vocabularies, seed=1), synthetic_profiles(n_mentors, vocabularies),
+            CSV_MENTOR_COLUMNS, CSV_MENTOR_COLUMNS)
+        exact = None
+        # brute first: it is the recall baseline
+        for backend in sorted(args.backends, key=lambda name: name != "brute"):
+            if backend == "ball_tree" and n_mentors * mentors.shape[1] * 8 > MAX_DENSE_BYTES:
+                print(f"{n_mentors:>9} {backend:>9}  skipped: dense rows exceed {MAX_DENSE_BYTES >> 30} GiB")
+                continue
+            build_time, latencies, distances, row_bytes = bench_backend(backend, mentors, queries, args.k, columns)
+            if exact is None:
+                exact = bench_backend("brute", mentors, queries, args.k, columns)[2] if backend != "brute" else distances
+            p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+            print(f"{n_mentors:>9} {backend:>9} {build_time:8.2f} {p50:8.2f} {p99:8.2f} "
+                  f"{recall_at_k(distances, exact):9.3f} {row_bytes:7.0f}")
+
+
+if __name__ == "__main__":
+    main()
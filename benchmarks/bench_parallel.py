@@ -0,0 +1,58 @@
+"""
+Benchmark sharded batch matching against the serial path.
+
+Fits a matcher on synthetic mentees and mentors (see
+synthetic.synthetic_profiles) and times MentorMatcher.fit (token parsing
+and encoding) and MentorMatcher.match_all_mentees serially and with each
+`--workers` count. Reports the speedups over serial, and checks that every
+parallel fit and result is identical to the serial one.
+
+Usage: python benchmarks/bench_parallel.py [--mentees 100000] [--mentors 100000]
+           [--workers 2 4 8 16 32] [--k 5]
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mentor_matcher import MentorMatcher  # noqa: E402
+from preprocessing import CSV_MENTOR_COLUMNS  # noqa: E402
+from synthetic import bundled_vocabularies, synthetic_profiles  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mentees", type=int, default=100_000)
+    parser.add_argument("--mentors", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4, 8, 16, 32])
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+
+    vocabularies = bundled_vocabularies()
+    mentees = synthetic_profiles(args.mentees, vocabularies, seed=1)
+    mentors = synthetic_profiles(args.mentors, vocabularies)
+    print(f"{args.mentees} mentees x {args.mentors} mentors, k={args.k}, {os.cpu_count()} CPUs")
+    print(f"{'workers':>8} {'fit s':>8} {'speedup':>8} {'match s':>8} {'speedup':>8} {'identical':>10}")
+    serial = None
+    for n_workers in [1, *args.workers]:
+        matcher = MentorMatcher(CSV_MENTOR_COLUMNS, CSV_MENTOR_COLUMNS)
+        start = time.perf_counter()
+        matcher.fit(mentees, mentors, n_workers=n_workers)
+        fit_time = time.perf_counter() - start
+        start = time.perf_counter()
+        result = matcher.match_all_mentees(args.k, n_workers=n_workers)
+        match_time = time.perf_counter() - start
+        if serial is None:
+            serial = matcher, result, fit_time, match_time
+        identical = "-" if serial[0] is matcher else str(
+            matcher.columns == serial[0].columns and (matcher.mentee_matrix != serial[0].mentee_matrix).nnz == 0
+            and (matcher.mentor_matrix != serial[0].mentor_matrix).nnz == 0 and result.equals(serial[1]))
+        print(f"{n_workers:>8} {fit_time:8.2f} {serial[2] / fit_time:8.2f} "
+              f"{match_time:8.2f} {serial[3] / match_time:8.2f} {identical:>10}")
+
+if __name__ == "__main__":
+    main()
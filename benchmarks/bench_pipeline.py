@@ -0,0 +1,197 @@
+"""
+Benchmark the matching pipeline stages on synthetic populations.
+
+For each size, a seeded synthetic mentee table and mentor table of that
+many rows each (see synthetic.write_synthetic_population) are written as
+CSVs. The enhanced_matching pipeline then runs on them stage by stage:
+  - load_and_preprocess_data   read and normalize both CSVs
+  - create_feature_vectors     encode both tables (sparse CSR)
+  - build_knn_model            build the neighbor index over the mentors
+  - find_mentors_for_mentee    `--queries` single-mentee lookups
+
+Every size runs in a fresh interpreter, so memory readings are not carried
+over between sizes. Each stage reports wall time and the peak resident set
+size sampled while it ran. The report is written as JSON (`--output`). With
+`--compare`, the times are checked against an earlier report, e.g. one from
+the parent commit, and the script exits non-zero when a stage has slowed
+beyond `--tolerance`.
+
+Usage: python benchmarks/bench_pipeline.py [--sizes 1000 10000 100000 1000000]
+           [--queries 100] [--backend sklearn] [--seed 0]
+           [--output bench_pipeline.json] [--compare baseline.json]
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from enhanced_matching import (  # noqa: E402
+    build_knn_model,
+    create_feature_vectors,
+    find_mentors_for_mentee,
+    load_and_preprocess_data,
+)
+from neighbor_index import INDEX_BACKENDS  # noqa: E402
+from synthetic import write_synthetic_population  # noqa: E402
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+SAMPLE_INTERVAL = 0.01
+
+
+def _rss_bytes():
+    """Current resident set size; the process high-water mark where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class PeakMemory:
+    """Samples the resident set size in a background thread while the block runs."""
+
+    def __enter__(self):
+        self.peak = _rss_bytes()
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._done.set()
+        self._thread.join()
+        self.peak = max(self.peak, _rss_bytes())
+        return False
+
+    def _sample(self):
+        while not self._done.wait(SAMPLE_INTERVAL):
+            self.peak = max(self.peak, _rss_bytes())
+
+
+def run_stage(results, rows, stage, fn, *args, **extra):
+    with PeakMemory() as memory:
+        start = time.perf_counter()
+        value = fn(*args)
+        seconds = time.perf_counter() - start
+    results.append({"rows": rows, "stage": stage, "seconds": seconds,
+                    "peak_rss_mb": memory.peak / 2**20, **extra})
+    return value
+
+
+def bench_size(rows, queries, backend, seed):
+    """Stage results for one population size, run in this process."""
+    results = []
+    if backend == "sklearn":
+        # build_knn_model imports sklearn lazily; keep that one-off cost (see
+        # bench_importtime) out of the build timing
+        import sklearn.neighbors  # noqa: F401
+    with tempfile.TemporaryDirectory() as directory:
+        mentee_file, mentor_file = write_synthetic_population(rows, rows, directory, seed=seed)
+        mentee_data, mentor_data = run_stage(
+            results, rows, "load_and_preprocess_data", load_and_preprocess_data, mentee_file, mentor_file)
+    mentee_features, mentor_features = run_stage(
+        results, rows, "create_feature_vectors", create_feature_vectors, mentee_data, mentor_data, True)
+    knn = run_stage(results, rows, "build_knn_model", build_knn_model, mentor_features, 5,
+                    None if backend == "sklearn" else backend)
+    mentee_indices = np.random.default_rng(seed).integers(0, rows, queries)
+
+    def lookups():
+        for i in mentee_indices:
+            find_mentors_for_mentee(int(i), mentee_features, knn, mentor_data, mentee_data, k=5)
+
+    run_stage(results, rows, "find_mentors_for_mentee", lookups, queries=queries)
+    results[-1]["ms_per_query"] = results[-1]["seconds"] / queries * 1000
+    return results
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report, baseline, tolerance):
+    """Print time ratios against a baseline report; return the stages slower than 1 + tolerance."""
+    before = {(r["rows"], r["stage"]): r for r in baseline["results"]}
+    regressions = []
+    print(f"\ncompared with {baseline.get('commit') or 'baseline'}:")
+    for result in report["results"]:
+        old = before.get((result["rows"], result["stage"]))
+        if old is None:
+            continue
+        ratio = result["seconds"] / max(old["seconds"], 1e-9)
+        flag = "  REGRESSION" if ratio > 1 + tolerance else ""
+        print(f"{result['rows']:>9} {result['stage']:>24} {ratio:6.2f}x time "
+              f"{result['peak_rss_mb'] / max(old['peak_rss_mb'], 1e-9):6.2f}x memory{flag}")
+        if flag:
+            regressions.append((result["rows"], result["stage"]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="rows per table")
+    parser.add_argument("--queries", type=int, default=100, help="find_mentors_for_mentee calls per size")
+    parser.add_argument("--backend", default="sklearn", choices=["sklearn"] + list(INDEX_BACKENDS),
+                        help="build_knn_model backend; sklearn is its NearestNeighbors default")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="bench_pipeline.json", help="JSON report path")
+    parser.add_argument("--compare", help="earlier JSON report to compare times against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown before flagging")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        json.dump(bench_size(args.child, args.queries, args.backend, args.seed), sys.stdout)
+        return
+
+    report = {
+        "benchmark": "pipeline",
+        "commit": _commit(),
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "queries": args.queries,
+        "backend": args.backend,
+        "results": [],
+    }
+    print(f"{'rows':>9} {'stage':>24} {'seconds':>9} {'peak MB':>9}")
+    for rows in args.sizes:
+        child = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", str(rows), "--queries", str(args.queries),
+             "--backend", args.backend, "--seed", str(args.seed)],
+            capture_output=True, text=True, check=True)
+        for result in json.loads(child.stdout):
+            report["results"].append(result)
+            print(f"{rows:>9} {result['stage']:>24} {result['seconds']:9.3f} {result['peak_rss_mb']:9.0f}")
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"report written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Benchmark the inverted-list pre-filter against a full scan.
+
+For synthetic mentor pools (see synthetic.synthetic_profiles), runs single
+mentee queries through MentorMatcher.match without filters (exact brute
+force over every mentor) and with hard filters on field / languages /
+country, and reports the mean share of mentors left after filtering and
+the per-query latency.
+
+Usage: python benchmarks/bench_prefilter.py [--sizes 100000 1000000] [--queries 200]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mentor_matcher import MentorMatcher  # noqa: E402
+from preprocessing import CSV_MENTOR_COLUMNS  # noqa: E402
+from synthetic import bundled_vocabularies, synthetic_profiles  # noqa: E402
+
+SCENARIOS = {
+    "no filter": {},
+    "language": {"filters": ("languages",)},
+    "field or language": {"filters": ("field", "languages"), "match_any": True},
+    "field and language": {"filters": ("field", "languages")},
+    "field and country": {"filters": ("field", "country")},
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000], help="mentor counts")
+    parser.add_argument("--queries", type=int, default=200, help="single-mentee queries per scenario")
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+
+    vocabularies = bundled_vocabularies()
+    print(f"{'mentors':>9} {'scenario':>20} {'kept':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    for n_mentors in args.sizes:
+        with contextlib.redirect_stdout(io.StringIO()):
+            matcher = MentorMatcher(CSV_MENTOR_COLUMNS, CSV_MENTOR_COLUMNS).fit(
+                synthetic_profiles(args.queries, vocabularies, seed=1), synthetic_profiles(n_mentors, vocabularies))
+        blocking = matcher._blocking_index()
+        for name, options in SCENARIOS.items():
+            latencies, kept = np.empty(args.queries), np.empty(args.queries)
+            for i in range(args.queries):
+                if options:
+                    kept[i] = len(blocking.candidates(
+                        matcher.mentee_matrix[i], options["filters"], options.get("match_any", False)))
+                else:
+                    kept[i] = n_mentors
+                start = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    matcher.match(i, args.k, **options)
+                latencies[i] = time.perf_counter() - start
+            p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+            print(f"{n_mentors:>9} {name:>20} {kept.mean() / n_mentors:8.2%} {p50:8.2f} {p99:8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark the CSV preprocessing paths.
+
+Compares, on a synthetic CSV pair resampled from the bundled data:
+  - legacy:    read_csv + the per-row .apply(lambda ...) chains that
+               load_and_preprocess_data used to run (split(', ') parsing)
+  - normalize: load_and_preprocess_data's vectorized normalizer, which
+               still builds per-row list columns for the interactive app
+  - coded:     preprocessing.encode_csv_files, raw CSV straight to CSR
+               through interned token ids, no per-row lists
+
+and reports the vocabulary size each tokenization produces.
+
+Usage: python benchmarks/bench_preprocessing.py [--rows 1000000]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from enhanced_matching import load_and_preprocess_data  # noqa: E402
+from preprocessing import encode_csv_files  # noqa: E402
+
+
+def legacy_preprocess(mentee_file, mentor_file):
+    """The pre-vectorization parsing path, kept here as the baseline."""
+    mentee_data = pd.read_csv(mentee_file)
+    mentor_data = pd.read_csv(mentor_file)
+    mentee_data["Speaking Language"] = mentee_data["Speaking Language"].fillna("")
+    mentor_data["speaking_language"] = mentor_data["speaking_language"].fillna("")
+    for frame, columns in ((mentee_data, ("STEM Skills", "Interests")), (mentor_data, ("stem_skills", "interests"))):
+        for col in columns:
+            frame[col] = frame[col].apply(lambda x: str(x).split(', ') if isinstance(x, str) else [])
+            frame[col] = frame[col].apply(lambda items: [s.lower() for s in items])
+    mentee_data['languages'] = mentee_data['Speaking Language'].apply(
+        lambda x: [lang.strip().lower() for lang in (x.replace("/", ",") if isinstance(x, str) else "").split(",") if lang.strip()]
+    )
+    mentor_data['languages'] = mentor_data['speaking_language'].apply(
+        lambda x: [lang.strip().lower() for lang in str(x).split() if lang.strip()]
+    )
+    mentee_data['country_clean'] = mentee_data['Country'].apply(lambda x: str(x).lower().strip())
+    mentor_data['country_clean'] = mentor_data['country'].apply(lambda x: str(x).lower().strip())
+    return mentee_data, mentor_data
+
+
+def write_synthetic_csvs(n_rows, directory, seed=0):
+    """Resample the bundled CSVs (with replacement) to n_rows rows per table."""
+    rng = np.random.default_rng(seed)
+    paths = []
+    for name in ("menteedataconvergent.csv", "mentordataconvergent.csv"):
+        source = pd.read_csv(os.path.join(ROOT, name))
+        sample = source.iloc[rng.integers(0, len(source), n_rows)]
+        path = os.path.join(directory, name)
+        sample.to_csv(path, index=False)
+        paths.append(path)
+    return paths
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000, help="rows per table")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        mentee_file, mentor_file = write_synthetic_csvs(args.rows, directory)
+        legacy_time, (legacy_mentees, legacy_mentors) = timed(legacy_preprocess, mentee_file, mentor_file)
+        normalize_time, _ = timed(load_and_preprocess_data, mentee_file, mentor_file)
+        coded_time, (columns, _, _) = timed(encode_csv_files, mentee_file, mentor_file)
+
+    legacy_vocabulary = sum(
+        len(set(pd.concat([legacy_mentees[a], legacy_mentors[b]]).explode().dropna()))
+        for a, b in (("STEM Skills", "stem_skills"), ("Interests", "interests")))
+    new_vocabulary = sum(block in ("skills", "interests") for block, _ in columns)
+    print(f"rows per table:        {args.rows}")
+    print(f"legacy apply chains:   {legacy_time:8.2f}s")
+    print(f"vectorized normalize:  {normalize_time:8.2f}s")
+    print(f"coded CSV -> CSR:      {coded_time:8.2f}s")
+    print(f"skill+interest vocabulary: legacy {legacy_vocabulary}, parsed {new_vocabulary}")
+
+
+if __name__ == "__main__":
+    main()
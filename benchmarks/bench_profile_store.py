@@ -0,0 +1,60 @@
+"""
+Benchmark the columnar profile store against the CSV round trip.
+
+On a synthetic mentee CSV resampled from the bundled data, measures:
+  - startup: load_and_preprocess_data (read_csv + list parsing) versus
+             ProfileStore.load (memory-mapped snapshot, no parsing)
+  - insert:  rewriting the whole CSV with to_csv, as the app used to on
+             every signup, versus ProfileStore.append (one delta-log line)
+
+Usage: python benchmarks/bench_profile_store.py [--rows 100000] [--inserts 20]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_preprocessing import timed, write_synthetic_csvs  # noqa: E402
+from enhanced_matching import load_and_preprocess_data  # noqa: E402
+from profile_store import SNAPSHOT_SUFFIX, ProfileStore  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000, help="rows per table")
+    parser.add_argument("--inserts", type=int, default=20, help="single-row inserts to time")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        mentee_file, mentor_file = write_synthetic_csvs(args.rows, directory)
+        csv_load_time, (mentee_data, _) = timed(load_and_preprocess_data, mentee_file, mentor_file)
+        store = ProfileStore(os.path.join(directory, "mentees"), compact_every=args.inserts + 1)
+        store.write(mentee_data)
+        store_load_time, _ = timed(ProfileStore(store.directory).load)
+        # load_and_preprocess_data covers both tables; count the mentee share only
+        csv_load_time /= 2
+
+        new_row = mentee_data.iloc[[0]]
+        start = time.perf_counter()
+        for _ in range(args.inserts):
+            mentee_data.to_csv(mentee_file, index=False)
+        csv_insert_time = (time.perf_counter() - start) / args.inserts
+        start = time.perf_counter()
+        for _ in range(args.inserts):
+            store.append(new_row)
+        store_insert_time = (time.perf_counter() - start) / args.inserts
+
+    print(f"rows:                   {args.rows}  (snapshot format {SNAPSHOT_SUFFIX})")
+    print(f"startup, CSV + parse:   {csv_load_time:8.3f}s")
+    print(f"startup, store load:    {store_load_time:8.3f}s")
+    print(f"insert, CSV rewrite:    {csv_insert_time * 1000:8.2f}ms")
+    print(f"insert, delta append:   {store_insert_time * 1000:8.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Load test the asyncio matching service against the in-memory stub database.
+
+Seeds a StubClient from the bundled CSVs, starts async_service on a free
+local port and drives it with `--concurrency` keep-alive connections issuing
+GET /match/<id> for random mentees until `--requests` have completed. Reports
+throughput, client-side latency percentiles and the service's own batching,
+writer and stage-timing counters.
+
+Usage: python benchmarks/load_test.py [--mentees 20000] [--mentors 5000]
+           [--requests 5000] [--concurrency 64] [--db-latency 0.002]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# Keep the load test's matcher cache out of the working tree
+os.environ.setdefault("MATCHER_CACHE_PATH", os.path.join(tempfile.mkdtemp(), "matcher"))
+
+from async_service import MatchingService  # noqa: E402
+from match_store import SupabaseMatchStore  # noqa: E402
+from stub_db import StubClient, seed_from_csv  # noqa: E402
+
+
+async def _get(reader, writer, path):
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.decode().partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def _client(port, mentee_ids, latencies, statuses):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    for mentee_id in mentee_ids:
+        start = time.perf_counter()
+        status, _ = await _get(reader, writer, f"/match/{mentee_id}")
+        latencies.append(time.perf_counter() - start)
+        statuses[status] = statuses.get(status, 0) + 1
+    writer.close()
+
+
+async def run(args):
+    client = seed_from_csv(StubClient(latency=args.db_latency), os.path.join(ROOT, "menteedataconvergent.csv"),
+                           os.path.join(ROOT, "mentordataconvergent.csv"), args.mentees, args.mentors)
+    service = MatchingService(client, SupabaseMatchStore(client), sync_interval=0)
+    with contextlib.redirect_stdout(io.StringIO()):
+        port = await service.start(port=0)
+
+    rng = np.random.default_rng(0)
+    mentee_ids = rng.integers(1, args.mentees + 1, args.requests).tolist()
+    latencies, statuses = [], {}
+    start = time.perf_counter()
+    await asyncio.gather(*(_client(port, mentee_ids[i::args.concurrency], latencies, statuses)
+                           for i in range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    _, metrics = await _get(reader, writer, "/metrics.json")
+    writer.close()
+    with contextlib.redirect_stdout(io.StringIO()):
+        await service.stop()
+
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+    print(f"mentees / mentors:  {args.mentees} / {args.mentors}  (stub db latency {args.db_latency * 1000:.1f}ms)")
+    print(f"requests:           {len(latencies)} over {args.concurrency} connections, statuses {statuses}")
+    print(f"throughput:         {len(latencies) / elapsed:.0f} req/s")
+    print(f"latency p50 / p99:  {p50:.1f}ms / {p99:.1f}ms")
+    print(f"batches:            {metrics.get('batches_total', 0)} "
+          f"(mean size {metrics.get('mean_batch_size', 0):.1f}, max {metrics.get('max_batch_size', 0)})")
+    print(f"coalesced lookups:  {metrics.get('coalesced_total', 0)}")
+    print(f"match rows written: {metrics.get('match_rows_written_total', 0)}")
+    for name, timings in sorted(metrics.get("stages", {}).items()):
+        print(f"stage {name + ':':<13} {timings['count']} calls, "
+              f"mean {timings['sum_seconds'] / timings['count'] * 1000:.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mentees", type=int, default=20_000)
+    parser.add_argument("--mentors", type=int, default=5_000)
+    parser.add_argument("--requests", type=int, default=5_000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--db-latency", type=float, default=0.002, help="seconds per stub query")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Seeded synthetic mentee and mentor populations for the benchmarks.
+
+Token vocabularies come from the bundled CSVs. Fields, countries, languages,
+skills and interests are drawn with Zipf-like weights (the r-th most frequent
+token has weight 1/r), so a few tokens are common and most are rare, as in
+the real data. Profiles speak one to three languages.
+
+synthetic_profiles returns encoder-ready, mentor-shaped frames.
+synthetic_population and write_synthetic_population produce frames in the
+raw CSV schemas, so load_and_preprocess_data's parsing is exercised too:
+stringified list cells, "/"-separated mentee languages and space-separated
+mentor languages. Names, degrees, colleges and work experience are
+resampled from the bundled rows.
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from enhanced_matching import load_and_preprocess_data  # noqa: E402
+
+MENTEE_FILE = os.path.join(ROOT, "menteedataconvergent.csv")
+MENTOR_FILE = os.path.join(ROOT, "mentordataconvergent.csv")
+# Age ranges of the bundled tables, widened a little
+MENTEE_AGES = (18, 35)
+MENTOR_AGES = (28, 60)
+
+
+def bundled_vocabularies():
+    """Token vocabularies of each block in the bundled CSVs, most frequent first."""
+    mentee_data, mentor_data = load_and_preprocess_data(MENTEE_FILE, MENTOR_FILE)
+    pairs = {"skills": ("STEM Skills", "stem_skills"), "interests": ("Interests", "interests"),
+             "languages": ("languages", "languages"), "country": ("country_clean", "country_clean"),
+             "field": ("Desired Field", "field")}
+    return {block: pd.concat([mentee_data[a], mentor_data[b]]).explode().dropna().value_counts().index.tolist()
+            for block, (a, b) in pairs.items()}
+
+
+def _zipf_choice(rng, vocabulary, size):
+    weights = 1.0 / np.arange(1, len(vocabulary) + 1)
+    return np.asarray(vocabulary, dtype=object)[rng.choice(len(vocabulary), size, p=weights / weights.sum())]
+
+
+def _token_lists(rng, vocabulary, n_rows, low, high):
+    counts = rng.integers(low, high + 1, n_rows)
+    tokens = _zipf_choice(rng, vocabulary, counts.sum()).tolist()
+    offsets = np.concatenate([[0], np.cumsum(counts)]).tolist()
+    # A token drawn twice for one profile is kept once
+    return [list(dict.fromkeys(tokens[start:stop])) for start, stop in zip(offsets[:-1], offsets[1:])]
+
+
+def synthetic_profiles(n_rows, vocabularies, seed=0):
+    """A mentor-shaped frame (CSV_MENTOR_COLUMNS) of n_rows synthetic profiles."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "stem_skills": _token_lists(rng, vocabularies["skills"], n_rows, 2, 6),
+        "interests": _token_lists(rng, vocabularies["interests"], n_rows, 1, 4),
+        "field": _zipf_choice(rng, vocabularies["field"], n_rows),
+        "age": rng.integers(20, 66, n_rows),
+        "languages": _token_lists(rng, vocabularies["languages"], n_rows, 1, 3),
+        "country_clean": _zipf_choice(rng, vocabularies["country"], n_rows),
+    })
+
+
+def _list_cells(token_lists):
+    """Token lists in the bundled CSVs' cell format: a stringified list of "', '"-split fragments."""
+    return [str(str(tokens).split(", ")) for tokens in token_lists]
+
+
+def _resample(rng, column, n_rows):
+    return column.to_numpy()[rng.integers(0, len(column), n_rows)]
+
+
+def _raw_frame(rng, n_rows, vocabularies, source, names, language_sep, ages):
+    """One table in its raw CSV schema; names maps the schema's roles to its column names."""
+    languages = _token_lists(rng, vocabularies["languages"], n_rows, 1, 3)
+    countries = _zipf_choice(rng, vocabularies["country"], n_rows)
+    return pd.DataFrame({
+        names["name"]: _resample(rng, source[names["name"]], n_rows),
+        names["country"]: [country.title() for country in countries],
+        names["speaking_language"]: [language_sep.join(lang.title() for lang in langs) for langs in languages],
+        names["field"]: _zipf_choice(rng, vocabularies["field"], n_rows),
+        names["degree"]: _resample(rng, source[names["degree"]], n_rows),
+        names["college"]: _resample(rng, source[names["college"]], n_rows),
+        names["skills"]: _list_cells(_token_lists(rng, vocabularies["skills"], n_rows, 2, 6)),
+        names["interests"]: _list_cells(_token_lists(rng, vocabularies["interests"], n_rows, 1, 5)),
+        names["experience"]: _resample(rng, source[names["experience"]], n_rows),
+        names["age"]: rng.integers(ages[0], ages[1] + 1, n_rows),
+        "languages": [str(langs) for langs in languages],
+        "country_clean": countries,
+    })
+
+
+def synthetic_population(n_mentees, n_mentors, vocabularies=None, seed=0):
+    """(mentee frame, mentor frame) in the bundled CSVs' raw schemas."""
+    vocabularies = vocabularies or bundled_vocabularies()
+    rng = np.random.default_rng(seed)
+    mentees = _raw_frame(rng, n_mentees, vocabularies, pd.read_csv(MENTEE_FILE), {
+        "name": "Name", "country": "Country", "speaking_language": "Speaking Language",
+        "field": "Desired Field", "degree": "Degree", "college": "College", "skills": "STEM Skills",
+        "interests": "Interests", "experience": "Prior Work Experience", "age": "Age"}, "/", MENTEE_AGES)
+    mentors = _raw_frame(rng, n_mentors, vocabularies, pd.read_csv(MENTOR_FILE), {
+        "name": "name", "country": "country", "speaking_language": "speaking_language",
+        "field": "field", "degree": "degree", "college": "college", "skills": "stem_skills",
+        "interests": "interests", "experience": "work_experience", "age": "age"}, " ", MENTOR_AGES)
+    return mentees, mentors
+
+
+def write_synthetic_population(n_mentees, n_mentors, directory, vocabularies=None, seed=0):
+    """Write the synthetic tables as CSVs named like the bundled ones; returns (mentee path, mentor path)."""
+    mentees, mentors = synthetic_population(n_mentees, n_mentors, vocabularies, seed)
+    paths = (os.path.join(directory, os.path.basename(MENTEE_FILE)),
+             os.path.join(directory, os.path.basename(MENTOR_FILE)))
+    mentees.to_csv(paths[0], index=False)
+    mentors.to_csv(paths[1], index=False)
+    return paths
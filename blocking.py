@@ -0,0 +1,94 @@
+"""
+Inverted-list pre-filter on the hard-constraint blocks (field, languages, country).
+
+Every field, language and country token is a column of the mentor matrix, so
+the inverted list of a token is simply that column in CSC form: the sorted
+positions of the mentors carrying it. A query's candidate set is the union
+of the lists of its own tokens in a block ("shares at least one language"),
+combined across the filtered blocks with intersection (all blocks must
+match) or union (any block may match). The neighbor search then only scores
+the candidates, so the per-query work follows the candidate count rather
+than the mentor pool.
+"""
+import numpy as np
+
+FILTER_BLOCKS = ("field", "languages", "country")
+
+
+class BlockingIndex:
+    """Inverted lists of mentor positions per token column, built from a FeatureRows store.
+
+    The lists are a snapshot: `version` records the store version they were
+    built from, and the owner rebuilds them once the store has changed.
+    """
+
+    def __init__(self, rows, columns):
+        self._rows = rows.matrix
+        csc = self._rows.tocsc()
+        csc.sort_indices()
+        self.version = rows.version
+        self.size = rows.size
+        self._indptr = csc.indptr
+        self._positions = csc.indices
+        self._blocks = np.array([block for block, _ in columns], dtype=object)
+
+    def postings(self, column):
+        """Sorted positions of the mentors with a nonzero entry in column."""
+        return self._positions[self._indptr[column]:self._indptr[column + 1]]
+
+    def query_columns(self, query, block):
+        """The columns of a 1 x n CSR query that belong to block."""
+        return query.indices[self._blocks[query.indices] == block]
+
+    def sharing(self, query, block):
+        """Sorted positions of the mentors sharing at least one `block` token with the query."""
+        lists = [self.postings(column) for column in self.query_columns(query, block)]
+        if not lists:
+            return np.zeros(0, dtype=np.int64)
+        if len(lists) == 1:
+            return lists[0]
+        if 8 * sum(len(positions) for positions in lists) < self.size:
+            return np.unique(np.concatenate(lists))
+        # Long lists: a mask over all mentors is cheaper than sorting them
+        is_shared = np.zeros(self.size, dtype=bool)
+        for positions in lists:
+            is_shared[positions] = True
+        return np.flatnonzero(is_shared)
+
+    def shares(self, query, block, positions):
+        """Mask over positions: does each of those mentors share a `block` token with the query?
+
+        Reads only the given mentors' rows, so the cost follows len(positions)
+        rather than the length of the inverted lists.
+        """
+        columns = self.query_columns(query, block)
+        if not len(columns):
+            return np.zeros(len(positions), dtype=bool)
+        return np.diff(self._rows[positions][:, columns].indptr) > 0
+
+    def candidates(self, query, blocks, match_any=False):
+        """Sorted positions of the mentors that match the query on all (or, with match_any, any) blocks.
+
+        For "all", only the block with the shortest inverted lists is expanded;
+        its mentors are then checked against the other blocks row by row.
+        """
+        unknown = set(blocks) - set(FILTER_BLOCKS)
+        if unknown:
+            raise ValueError(f"Cannot filter on {sorted(unknown)}; choose from {FILTER_BLOCKS}")
+        if not blocks:
+            return np.arange(self.size)
+        if match_any:
+            is_candidate = np.zeros(self.size, dtype=bool)
+            for block in blocks:
+                for column in self.query_columns(query, block):
+                    is_candidate[self.postings(column)] = True
+            return np.flatnonzero(is_candidate)
+        list_lengths = {block: sum(self._indptr[c + 1] - self._indptr[c] for c in self.query_columns(query, block))
+                        for block in blocks}
+        blocks = sorted(blocks, key=list_lengths.get)
+        result = self.sharing(query, blocks[0])
+        for block in blocks[1:]:
+            if not len(result):
+                break
+            result = result[self.shares(query, block, result)]
+        return result
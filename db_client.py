@@ -0,0 +1,36 @@
+"""
+Lazily constructed, pooled database clients.
+
+Importing a module that talks to Supabase neither imports supabase-py nor
+opens a client: get_client builds one on first use from SUPABASE_URL /
+SUPABASE_KEY and hands the same instance to every later caller, so its HTTP
+connection pool is shared by all requests in the process. Clients are
+pooled per (process, url, key): a forked worker builds its own instead of
+reusing a parent's sockets.
+"""
+import os
+import threading
+
+_clients = {}
+_lock = threading.Lock()
+
+
+def get_client(url=None, key=None):
+    """The process's client for url / key (default: SUPABASE_URL / SUPABASE_KEY), created on first use."""
+    url = url or os.environ.get("SUPABASE_URL")
+    key = key or os.environ.get("SUPABASE_KEY")
+    if not (url and key):
+        raise RuntimeError("SUPABASE_URL and SUPABASE_KEY must be set, or a client passed explicitly")
+    pool_key = (os.getpid(), url, key)
+    with _lock:
+        client = _clients.get(pool_key)
+        if client is None:
+            from supabase import create_client
+            client = _clients[pool_key] = create_client(url, key)
+    return client
+
+
+def close_clients():
+    """Forget every pooled client; the next get_client builds a fresh one."""
+    with _lock:
+        _clients.clear()
@@ -1,54 +1,77 @@
+import logging
+import os
+
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import MultiLabelBinarizer
-from sklearn.neighbors import NearestNeighbors
-import matplotlib.pyplot as plt
-from itertools import chain
+import scipy.sparse as sp
 
-def load_and_preprocess_data(mentee_file, mentor_file):
-    """Load mentee and mentor CSV data and preprocess columns."""
-    print("\n[DEBUG] Loading data from files:", mentee_file, mentor_file)
-    mentee_data = pd.read_csv(mentee_file)
-    mentor_data = pd.read_csv(mentor_file)
-    print(f"[DEBUG] Mentee records: {len(mentee_data)}, Mentor records: {len(mentor_data)}")
+from instrumentation import configure_logging, stage
+from mentor_matcher import MentorMatcher
+from neighbor_index import make_index
+from parallel import parallel_encode_profiles
+from preprocessing import (
+    CATEGORICAL_BLOCKS,
+    CSV_ENGINE,
+    CSV_MENTEE_COLUMNS,
+    CSV_MENTOR_COLUMNS,
+    BLOCKS,
+    encode_profiles,
+    normalize_csv_profiles,
+)
+from profile_store import ProfileStore
+from scoring import block_indicator, block_sq_distances, score_breakdown
+from visualization import chart_key, render_match_chart
 
-    # Fill any NaN values in language columns with empty strings
-    mentee_data["Speaking Language"] = mentee_data["Speaking Language"].fillna("")
-    mentor_data["speaking_language"] = mentor_data["speaking_language"].fillna("")
+# Neighbor index backend for the interactive app (see neighbor_index.INDEX_BACKENDS)
+INDEX_BACKEND = os.environ.get("MATCHER_INDEX_BACKEND", "brute")
 
-    # Process STEM Skills and Interests (assumes comma separated for skills/interests)
-    print("[DEBUG] Processing STEM Skills and Interests")
-    mentee_data['STEM Skills'] = mentee_data['STEM Skills'].apply(
-        lambda x: str(x).split(', ') if isinstance(x, str) else [])
-    mentor_data['stem_skills'] = mentor_data['stem_skills'].apply(
-        lambda x: str(x).split(', ') if isinstance(x, str) else [])
-    mentee_data['Interests'] = mentee_data['Interests'].apply(
-        lambda x: str(x).split(', ') if isinstance(x, str) else [])
-    mentor_data['interests'] = mentor_data['interests'].apply(
-        lambda x: str(x).split(', ') if isinstance(x, str) else [])
+logger = logging.getLogger(__name__)
 
-    # Process Languages:
-    # For mentees: "Speaking Language" may be separated by "/" so normalize and split.
-    mentee_data['languages'] = mentee_data['Speaking Language'].apply(
-        lambda x: [lang.strip().lower() for lang in (x.replace("/", ",") if isinstance(x, str) else "").split(",") if lang.strip()]
-    )
-    # For mentors, assume languages are space separated.
-    mentor_data['languages'] = mentor_data['speaking_language'].apply(
-        lambda x: [lang.strip().lower() for lang in str(x).split() if lang.strip()]
-    )
+def load_and_preprocess_data(mentee_file, mentor_file):
+    """Load mentee and mentor CSV data and preprocess columns."""
+    logger.info("Loading data from files: %s %s", mentee_file, mentor_file)
+    with stage("load"):
+        mentee_data = pd.read_csv(mentee_file, engine=CSV_ENGINE)
+        mentor_data = pd.read_csv(mentor_file, engine=CSV_ENGINE)
+    logger.info("Mentee records: %d, Mentor records: %d", len(mentee_data), len(mentor_data))
 
-    # Process Country: (convert to lower case)
-    mentee_data['country_clean'] = mentee_data['Country'].apply(lambda x: str(x).lower().strip())
-    mentor_data['country_clean'] = mentor_data['country'].apply(lambda x: str(x).lower().strip())
+    # Single vectorized pass: parses the stringified list columns into clean,
+    # lowercased tokens and derives the languages / country_clean columns
+    logger.debug("Normalizing list, language and country columns")
+    normalize_csv_profiles(mentee_data, mentor_data)
 
-    print("[DEBUG] Preprocessing complete")
-    print("[DEBUG] Mentee sample:\n", mentee_data.head(2))
-    print("[DEBUG] Mentor sample:\n", mentor_data.head(2))
+    # The samples are only formatted when DEBUG records are emitted
+    logger.debug("Mentee sample:\n%s", mentee_data.head(2))
+    logger.debug("Mentor sample:\n%s", mentor_data.head(2))
     return mentee_data, mentor_data
 
-def create_feature_vectors(mentee_data, mentor_data):
+def load_profile_stores(mentee_file, mentor_file, store_dir='profile_store'):
+    """
+    Open the columnar mentee and mentor stores, seeding them from the CSVs on the
+    first run. Later starts load the memory-mapped snapshots and skip CSV parsing.
+    Returns (mentee_store, mentor_store, mentee_data, mentor_data).
     """
-    Create feature vectors using the union of classes for skills, interests, and languages.
+    mentee_store = ProfileStore(os.path.join(store_dir, 'mentees'))
+    mentor_store = ProfileStore(os.path.join(store_dir, 'mentors'))
+    if mentee_store.exists and mentor_store.exists:
+        logger.info("Loading profiles from store: %s", store_dir)
+        mentee_data, mentor_data = mentee_store.load(), mentor_store.load()
+        logger.info("Mentee records: %d, Mentor records: %d", len(mentee_data), len(mentor_data))
+        return mentee_store, mentor_store, mentee_data, mentor_data
+    mentee_data, mentor_data = load_and_preprocess_data(mentee_file, mentor_file)
+    mentee_store.write(mentee_data)
+    mentor_store.write(mentor_data)
+    logger.info("Seeded profile store: %s", store_dir)
+    return mentee_store, mentor_store, mentee_data, mentor_data
+
+def create_feature_vectors(mentee_data, mentor_data, sparse=False, n_workers=1):
+    """
+    Create feature vectors using the union of classes for skills, interests, fields,
+    languages and countries. Columns use a stable sorted layout shared by mentees
+    and mentors, each block is one-hot encoded into a CSR matrix and the weights
+    are applied as a column scaling. Pass sparse=True to get the CSR matrices
+    (accepted directly by build_knn_model) instead of dense arrays. With
+    n_workers > 1 the encoding is sharded over a process pool.
     Weight distribution:
       - STEM Skills:    20%
       - Interests:      7.5%
@@ -57,110 +80,45 @@ def create_feature_vectors(mentee_data, mentor_data):
       - Languages:      17.5%
       - Country:        15%
     """
-    print("\n[DEBUG] Creating feature vectors")
-    # Ensure languages columns are lists (in case of missing or NaN values)
-    mentee_data['languages'] = mentee_data['languages'].apply(lambda x: x if isinstance(x, list) else [])
-    mentor_data['languages'] = mentor_data['languages'].apply(lambda x: x if isinstance(x, list) else [])
-    
-    mentee_data['STEM Skills'] = mentee_data['STEM Skills'].apply(lambda skills: [s.lower() for s in skills])
-    mentor_data['stem_skills'] = mentor_data['stem_skills'].apply(lambda skills: [s.lower() for s in skills])
-    mentee_data['Interests'] = mentee_data['Interests'].apply(lambda interests: [i.lower() for i in interests])
-    mentor_data['interests'] = mentor_data['interests'].apply(lambda interests: [i.lower() for i in interests])
-    
-    all_skills = set(chain.from_iterable(mentee_data['STEM Skills'])) | set(chain.from_iterable(mentor_data['stem_skills']))
-    all_interests = set(chain.from_iterable(mentee_data['Interests'])) | set(chain.from_iterable(mentor_data['interests']))
-    all_languages = set(chain.from_iterable(mentee_data['languages'])) | set(chain.from_iterable(mentor_data['languages']))
-
-    # Encode STEM Skills
-    mlb_skills = MultiLabelBinarizer(classes=sorted(all_skills))
-    mentee_skills = mlb_skills.fit_transform(mentee_data['STEM Skills'])
-    mentor_skills = mlb_skills.transform(mentor_data['stem_skills'])
-    print(f"[DEBUG] Skills dims - Mentees: {mentee_skills.shape}, Mentors: {mentor_skills.shape}")
-
-    # Encode Interests
-    mlb_interests = MultiLabelBinarizer(classes=sorted(all_interests))
-    mentee_interests = mlb_interests.fit_transform(mentee_data['Interests'])
-    mentor_interests = mlb_interests.transform(mentor_data['interests'])
-    print(f"[DEBUG] Interests dims - Mentees: {mentee_interests.shape}, Mentors: {mentor_interests.shape}")
-
-    # Encode Fields using pd.get_dummies
-    print("[DEBUG] Encoding Fields")
-    mentee_fields = pd.get_dummies(mentee_data['Desired Field'])
-    mentor_fields = pd.get_dummies(mentor_data['field'])
-    all_fields = list(set(mentee_fields.columns) | set(mentor_fields.columns))
-    for col in all_fields:
-        if col not in mentee_fields.columns:
-            mentee_fields[col] = 0
-            print(f"[DEBUG] Added missing field '{col}' to mentee fields")
-        if col not in mentor_fields.columns:
-            mentor_fields[col] = 0
-            print(f"[DEBUG] Added missing field '{col}' to mentor fields")
-    mentee_fields = mentee_fields[all_fields]
-    mentor_fields = mentor_fields[all_fields]
-    print(f"[DEBUG] Field dims - Mentees: {mentee_fields.shape}, Mentors: {mentor_fields.shape}")
-
-    # Normalize Age
-    mentee_age = mentee_data[['Age']].values / 100.0
-    mentor_age = mentor_data[['age']].values / 100.0
-
-    # Encode Languages
-    print("[DEBUG] Encoding Languages")
-    mlb_languages = MultiLabelBinarizer(classes=sorted(all_languages))
-    mentee_languages = mlb_languages.fit_transform(mentee_data['languages'])
-    mentor_languages = mlb_languages.transform(mentor_data['languages'])
-    print(f"[DEBUG] Languages dims - Mentees: {mentee_languages.shape}, Mentors: {mentor_languages.shape}")
-
-    # Encode Country
-    print("[DEBUG] Encoding Country")
-    mentee_country = pd.get_dummies(mentee_data['country_clean'])
-    mentor_country = pd.get_dummies(mentor_data['country_clean'])
-    all_countries = list(set(mentee_country.columns) | set(mentor_country.columns))
-    for col in all_countries:
-        if col not in mentee_country.columns:
-            mentee_country[col] = 0
-            print(f"[DEBUG] Added missing country '{col}' to mentee country")
-        if col not in mentor_country.columns:
-            mentor_country[col] = 0
-            print(f"[DEBUG] Added missing country '{col}' to mentor country")
-    mentee_country = mentee_country[all_countries]
-    mentor_country = mentor_country[all_countries]
-    print(f"[DEBUG] Country dims - Mentees: {mentee_country.shape}, Mentors: {mentor_country.shape}")
-
-    print("[DEBUG] Combining features with new weights")
-    mentee_features = np.hstack([
-        mentee_skills * 0.20,
-        mentee_interests * 0.075,
-        mentee_fields.values * 0.30,
-        mentee_age * 0.10,
-        mentee_languages * 0.175,
-        mentee_country.values * 0.15
-    ])
-    mentor_features = np.hstack([
-        mentor_skills * 0.20,
-        mentor_interests * 0.075,
-        mentor_fields.values * 0.30,
-        mentor_age * 0.10,
-        mentor_languages * 0.175,
-        mentor_country.values * 0.15
-    ])
-    print(f"[DEBUG] Final feature dimensions - Mentees: {mentee_features.shape}, Mentors: {mentor_features.shape}")
+    logger.debug("Creating feature vectors")
+    if n_workers > 1:
+        columns, mentee_features, mentor_features = parallel_encode_profiles(
+            mentee_data, mentor_data, CSV_MENTEE_COLUMNS, CSV_MENTOR_COLUMNS, n_workers=n_workers)
+    else:
+        columns, mentee_features, mentor_features = encode_profiles(
+            mentee_data, mentor_data, CSV_MENTEE_COLUMNS, CSV_MENTOR_COLUMNS)
+    if logger.isEnabledFor(logging.DEBUG):
+        for block in CATEGORICAL_BLOCKS:
+            logger.debug("%s dims: %d", block.capitalize(), sum(b == block for b, _ in columns))
+    logger.debug("Final feature dimensions - Mentees: %s, Mentors: %s", mentee_features.shape, mentor_features.shape)
+    if not sparse:
+        return mentee_features.toarray(), mentor_features.toarray()
     return mentee_features, mentor_features
 
-def build_knn_model(mentor_features, n_neighbors=5):
-    """Build a KNN model based on mentor features."""
-    print(f"\n[DEBUG] Building KNN model with n_neighbors={n_neighbors}")
+def build_knn_model(mentor_features, n_neighbors=5, backend=None, columns=None):
+    """
+    Build a KNN model based on mentor features. backend=None keeps sklearn's
+    NearestNeighbors; otherwise it names a neighbor_index backend
+    ("brute", "ball_tree", "lsh" or "packed") with the same kneighbors
+    interface. "packed" also needs the feature columns from encode_profiles.
+    """
+    logger.debug("Building KNN model with n_neighbors=%d", n_neighbors)
     actual_neighbors = min(n_neighbors, mentor_features.shape[0])
     if actual_neighbors < n_neighbors:
-        print(f"[DEBUG] Adjusted n_neighbors to {actual_neighbors} due to mentor data size")
-    knn = NearestNeighbors(n_neighbors=actual_neighbors, metric='euclidean')
-    knn.fit(mentor_features)
-    print("[DEBUG] KNN model built successfully")
+        logger.info("Adjusted n_neighbors to %d due to mentor data size", actual_neighbors)
+    if backend is None:
+        from sklearn.neighbors import NearestNeighbors
+        with stage("index_build"):
+            knn = NearestNeighbors(n_neighbors=actual_neighbors, metric='euclidean')
+            knn.fit(mentor_features)
+    else:
+        knn = make_index(mentor_features, backend, actual_neighbors, columns)
     return knn
 
-def find_mentors_for_mentee(mentee_idx, mentee_features, knn_model, mentor_data, mentee_data, k=5):
-    """Find matching mentors for a given mentee index and display mentee stats."""
+def print_mentee_profile(mentee_idx, mentee_data):
+    """Display a mentee's profile stats."""
     mentee_record = mentee_data.iloc[mentee_idx]
-    print(f"\n[DEBUG] Mentee Profile for index {mentee_idx}:")
+    print(f"\nMentee Profile for index {mentee_idx}:")
     print(f"Name: {mentee_record['Name']}")
     print(f"Desired Field: {mentee_record['Desired Field']}")
     print(f"STEM Skills: {', '.join(mentee_record['STEM Skills'])}")
@@ -169,16 +127,27 @@ def find_mentors_for_mentee(mentee_idx, mentee_features, knn_model, mentor_data,
     print(f"Country: {mentee_record['country_clean']}")
     print(f"Age: {mentee_record['Age']}")
 
-    print(f"\n[DEBUG] Finding mentors for mentee index {mentee_idx}")
+def find_mentors_for_mentee(mentee_idx, mentee_features, knn_model, mentor_data, mentee_data, k=5, columns=None):
+    """Find matching mentors for a given mentee index.
+
+    Given the feature columns and a neighbor_index model, each match also gets
+    a score_breakdown: {block: points the block cost it}.
+    """
+    logger.debug("Finding mentors for mentee index %d (%s)", mentee_idx, mentee_data.iloc[mentee_idx]['Name'])
     mentee_vector = mentee_features[mentee_idx].reshape(1, -1)
-    distances, indices = knn_model.kneighbors(mentee_vector)
-    print(f"[DEBUG] Distances: {distances[0]}\n[DEBUG] Mentor indices: {indices[0]}")
+    with stage("query"):
+        distances, indices = knn_model.kneighbors(mentee_vector)
+    logger.debug("Distances: %s, mentor indices: %s", distances[0], indices[0])
     match_scores = 100 * (1.0 / (1.0 + distances[0]))
+    breakdowns = [None] * len(match_scores)
+    if columns is not None and hasattr(knn_model, "take"):
+        pairs = sp.csr_matrix(mentee_vector)[np.zeros(len(match_scores), dtype=np.int64)]
+        block_sq = block_sq_distances(pairs, knn_model.take(indices[0]), block_indicator(columns))
+        breakdowns = [dict(zip(BLOCKS, costs)) for costs in score_breakdown(block_sq, match_scores).tolist()]
 
     matched_mentors = []
-    for idx, score in zip(indices[0], match_scores):
+    for idx, score, breakdown in zip(indices[0], match_scores, breakdowns):
         mentor = mentor_data.iloc[idx]
-        print(f"[DEBUG] Processing mentor: {mentor['name']} with score {score:.1f}%")
         matched_mentors.append({
             'name': mentor['name'],
             'field': mentor['field'],
@@ -189,37 +158,35 @@ def find_mentors_for_mentee(mentee_idx, mentee_features, knn_model, mentor_data,
             'languages': mentor['languages'],
             'country': mentor['country']
         })
-    print(f"[DEBUG] Found {len(matched_mentors)} mentor matches")
+        if breakdown is not None:
+            matched_mentors[-1]['score_breakdown'] = breakdown
     return matched_mentors
 
+def format_breakdown(breakdown):
+    """The blocks that cost a match points, largest first, e.g. 'field 12.3, skills 6.0'."""
+    costs = sorted(breakdown.items(), key=lambda item: -item[1])
+    return ", ".join(f"{block} {points:.1f}" for block, points in costs if points >= 0.05) or "none"
+
 def visualize_matches(mentee_name, matched_mentors, save_path=None):
     """Create a bar chart visualization for mentor matches."""
-    print(f"\n[DEBUG] Visualizing matches for {mentee_name}")
-    names = [m['name'] for m in matched_mentors]
-    scores = [m['match_score'] for m in matched_mentors]
-    plt.figure(figsize=(12, 6))
-    plt.barh(range(len(names)), scores, color='skyblue')
-    plt.yticks(range(len(names)), names)
-    plt.xlabel('Match Score (%)')
-    plt.title(f'Top Mentor Matches for {mentee_name}')
-    for i, score in enumerate(scores):
-        plt.text(score + 1, i, f'{score:.1f}%', va='center')
-    plt.tight_layout()
     if save_path:
-        plt.savefig(save_path)
-        print(f"[DEBUG] Visualization saved to {save_path}")
+        with stage("render"):
+            png = render_match_chart(*chart_key(mentee_name, matched_mentors))
+        with open(save_path, 'wb') as f:
+            f.write(png)
+        logger.debug("Visualization for %s saved to %s", mentee_name, save_path)
     else:
-        print("[DEBUG] Save path not provided; visualization not saved")
-    plt.close()
+        logger.warning("Save path not provided; visualization not saved")
 
 def mentor_matching_application():
     """Main interactive mentor-mentee matching application."""
     print("\n=== Enhanced Mentor-Mentee Matching System ===\n")
     mentee_file = 'menteedataconvergent.csv'
     mentor_file = 'mentordataconvergent.csv'
-    mentee_data, mentor_data = load_and_preprocess_data(mentee_file, mentor_file)
-    mentee_features, mentor_features = create_feature_vectors(mentee_data, mentor_data)
-    knn_model = build_knn_model(mentor_features)
+    # Profiles live in the columnar store; the CSVs only seed it on the first run
+    mentee_store, mentor_store, mentee_data, mentor_data = load_profile_stores(mentee_file, mentor_file)
+    # The matcher is updated incrementally as mentees and mentors are added below
+    matcher = MentorMatcher(index_backend=INDEX_BACKEND).fit(mentee_data, mentor_data)
 
     while True:
         print("\nOptions:")
@@ -229,10 +196,9 @@ def mentor_matching_application():
         print("4. Create a new mentor")
         print("5. Exit")
         choice = input("\nEnter your choice (1-5): ").strip()
-        print(f"[DEBUG] Option selected: {choice}")
+        logger.debug("Option selected: %s", choice)
 
         if choice == '1':
-            print("[DEBUG] Option 1 selected: Match an existing mentee")
             print("\nSelect a mentee:")
             for i, (_, mentee) in enumerate(mentee_data.iterrows()):
                 print(f"{i+1}. {mentee['Name']} - {mentee['Desired Field']}")
@@ -240,10 +206,13 @@ def mentor_matching_application():
                 idx = int(input("\nEnter mentee number: ")) - 1
                 if 0 <= idx < len(mentee_data):
                     mentee_name = mentee_data.iloc[idx]['Name']
-                    matched = find_mentors_for_mentee(idx, mentee_features, knn_model, mentor_data, mentee_data, k=5)
+                    print_mentee_profile(idx, mentee_data)
+                    matched = find_mentors_for_mentee(idx, matcher.mentee_matrix, matcher.index, mentor_data, mentee_data,
+                                                      k=5, columns=matcher.columns)
                     print(f"\nTop Mentor Matches for {mentee_name}:")
                     for j, mentor in enumerate(matched):
                         print(f"{j+1}. Name: {mentor['name']} (Score: {mentor['match_score']:.1f}%)")
+                        print(f"   Points lost: {format_breakdown(mentor['score_breakdown'])}")
                         print(f"   Field: {mentor['field']}")
                         print(f"   Skills: {', '.join(mentor['skills'])}")
                         print(f"   Interests: {', '.join(mentor['interests'])}")
@@ -266,15 +235,14 @@ def mentor_matching_application():
                                     else:
                                         print(f"{key.capitalize()}: {value}")
                         else:
-                            print("[DEBUG] Invalid mentor selection")
+                            print("Invalid mentor selection")
                     else:
-                        print("[DEBUG] Skipping detailed mentor view")
+                        logger.debug("Skipping detailed mentor view")
                 else:
-                    print("[DEBUG] Mentee selection out of range")
+                    print("Mentee selection out of range")
             except ValueError:
-                print("[DEBUG] Invalid input; expecting a number")
+                print("Invalid input; expecting a number")
         elif choice == '2':
-            print("[DEBUG] Option 2 selected: Create a new mentee")
             name = input("Enter mentee name: ").strip()
             country = input("Enter mentee country: ").strip().lower()
             speaking_lang = input("Enter speaking languages (comma or slash separated): ").strip()
@@ -303,7 +271,7 @@ def mentor_matching_application():
             try:
                 age = int(input("Enter mentee age: ").strip())
             except ValueError:
-                print("[DEBUG] Age input invalid")
+                print("Age input invalid")
                 continue
                 
             # Process languages from input: for mentees, we split on comma or slash
@@ -328,18 +296,19 @@ def mentor_matching_application():
             
             old_count = len(mentee_data)
             mentee_data = pd.concat([mentee_data, new_row], ignore_index=True)
-            print(f"[DEBUG] Mentee data updated from {old_count} to {len(mentee_data)} rows")
-            # Save updated mentee CSV
-            mentee_data.to_csv(mentee_file, index=False)
-            # Recompute feature vectors and rebuild KNN model
-            mentee_features, mentor_features = create_feature_vectors(mentee_data, mentor_data)
-            knn_model = build_knn_model(mentor_features)
-            
+            logger.debug("Mentee data updated from %d to %d rows", old_count, len(mentee_data))
+            # Append the new mentee to the store's delta log
+            mentee_store.append(new_row)
+            # Encode only the new mentee; the mentor index is unchanged
             new_idx = len(mentee_data) - 1
-            matched = find_mentors_for_mentee(new_idx, mentee_features, knn_model, mentor_data, mentee_data, k=5)
+            matcher.add_mentee(new_idx, mentee_data.iloc[new_idx])
+            print_mentee_profile(new_idx, mentee_data)
+            matched = find_mentors_for_mentee(new_idx, matcher.mentee_matrix, matcher.index, mentor_data, mentee_data,
+                                              k=5, columns=matcher.columns)
             print(f"\nTop Mentor Matches for new mentee {name}:")
             for j, mentor in enumerate(matched):
                 print(f"{j+1}. Name: {mentor['name']} (Score: {mentor['match_score']:.1f}%)")
+                print(f"   Points lost: {format_breakdown(mentor['score_breakdown'])}")
                 print(f"   Field: {mentor['field']}")
                 print(f"   Skills: {', '.join(mentor['skills'])}")
                 print(f"   Interests: {', '.join(mentor['interests'])}")
@@ -351,13 +320,11 @@ def mentor_matching_application():
             print(f"Visualization saved as {vis_path}")
             
         elif choice == '3':
-            print("[DEBUG] Option 3 selected: List all mentees")
             print("\nMentee List:")
             for i, (_, mentee) in enumerate(mentee_data.iterrows()):
                 print(f"{i+1}. {mentee['Name']} - {mentee['Desired Field']}")
                 
         elif choice == '4':
-            print("[DEBUG] Option 4 selected: Create a new mentor")
             m_name = input("Enter mentor name: ").strip()
             m_country = input("Enter mentor country: ").strip().lower()
             m_lang = input("Enter speaking languages (space separated): ").strip()
@@ -376,7 +343,7 @@ def mentor_matching_application():
             try:
                 m_age = int(input("Enter mentor age: ").strip())
             except ValueError:
-                print("[DEBUG] Invalid age input, mentor not added")
+                print("Invalid age input, mentor not added")
                 continue
 
             # Process languages from input: for mentors, we split on whitespace
@@ -400,21 +367,19 @@ def mentor_matching_application():
             
             old_m_count = len(mentor_data)
             mentor_data = pd.concat([mentor_data, new_m_row], ignore_index=True)
-            print(f"[DEBUG] Mentor data updated from {old_m_count} to {len(mentor_data)} rows")
-            # Save updated mentor CSV
-            mentor_data.to_csv(mentor_file, index=False)
-            # Recompute feature vectors and rebuild KNN model
-            mentee_features, mentor_features = create_feature_vectors(mentee_data, mentor_data)
-            knn_model = build_knn_model(mentor_features)
-            print("[DEBUG] New mentor added successfully")
+            logger.debug("Mentor data updated from %d to %d rows", old_m_count, len(mentor_data))
+            # Append the new mentor to the store's delta log
+            mentor_store.append(new_m_row)
+            # Encode only the new mentor and patch it into the neighbor index
+            matcher.add_mentor(len(mentor_data) - 1, mentor_data.iloc[-1])
+            print("New mentor added successfully")
             
         elif choice == '5':
-            print("[DEBUG] Exiting application")
+            logger.debug("Exiting application")
             break
         else:
-            print("[DEBUG] Invalid option selected. Please choose 1-5.")
+            print("Invalid option selected. Please choose 1-5.")
 
 if __name__ == "__main__":
-    print("[DEBUG] Enhanced mentor matching script started")
-    mentor_matching_application()
-    print("[DEBUG] Script ended")
\ No newline at end of file
+    configure_logging()
+    mentor_matching_application()
\ No newline at end of file
@@ -0,0 +1,181 @@
+"""
+Leveled logging setup and per-stage timing metrics.
+
+Modules log through ``logging.getLogger(__name__)``; entry points call
+configure_logging, which takes its level from MATCHER_LOG_LEVEL (default
+INFO). Per-row and per-mentor detail is logged at DEBUG with lazy %-style
+arguments, so it costs nothing unless that level is enabled.
+
+The hot-path stages (STAGES) are timed with the `timed` decorator or the
+`stage` context manager into one histogram per stage; failed calls are also
+counted. render_prometheus exports them in the Prometheus text format.
+MATCHER_METRICS=0 turns recording off, leaving one attribute check per
+timed call.
+"""
+import bisect
+import functools
+import logging
+import os
+import threading
+import time
+
+STAGES = ("load", "preprocess", "encode", "index_build", "query", "persist", "render")
+# Histogram bucket upper bounds in seconds
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+
+def configure_logging(level=None):
+    """Send log records to stderr at level (default MATCHER_LOG_LEVEL, else INFO)."""
+    level = level or os.environ.get("MATCHER_LOG_LEVEL", "INFO")
+    logging.basicConfig(level=level.upper() if isinstance(level, str) else level, format=LOG_FORMAT)
+
+
+class Histogram:
+    """Bucketed count and sum of observed durations."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = tuple(buckets)
+        # One count per bucket plus the +Inf overflow; cumulated on export
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative_counts(self):
+        """(upper bound, observations <= bound) pairs ending with +Inf."""
+        running, result = 0, []
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            running += count
+            result.append((bound, running))
+        return result
+
+
+class StageMetrics:
+    """Per-stage duration histograms and error counters, updated from any thread."""
+
+    def __init__(self, enabled=True, buckets=BUCKETS):
+        self.enabled = enabled
+        self.buckets = buckets
+        self._histograms = {}
+        self._errors = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage_name, seconds, failed=False):
+        with self._lock:
+            histogram = self._histograms.get(stage_name)
+            if histogram is None:
+                histogram = self._histograms[stage_name] = Histogram(self.buckets)
+            histogram.observe(seconds)
+            if failed:
+                self._errors[stage_name] = self._errors.get(stage_name, 0) + 1
+
+    def histogram(self, stage_name):
+        """The stage's histogram, or None if it was never observed."""
+        return self._histograms.get(stage_name)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._errors.clear()
+
+    def snapshot(self):
+        """{stage: {"count", "sum_seconds", "errors"}} for the observed stages."""
+        with self._lock:
+            return {name: {"count": histogram.count, "sum_seconds": histogram.sum,
+                           "errors": self._errors.get(name, 0)}
+                    for name, histogram in self._histograms.items()}
+
+    def render_prometheus(self, prefix="matcher"):
+        """The stage histograms and error counters in the Prometheus text exposition format.
+
+        Every stage in STAGES is exported, with zero counts until it is first observed.
+        """
+        with self._lock:
+            observed = dict(self._histograms)
+            for name in STAGES:
+                observed.setdefault(name, Histogram(self.buckets))
+            histograms = {name: (histogram.cumulative_counts(), histogram.count, histogram.sum)
+                          for name, histogram in observed.items()}
+            errors = dict(self._errors)
+        lines = [f"# HELP {prefix}_stage_seconds Wall time spent per pipeline stage.",
+                 f"# TYPE {prefix}_stage_seconds histogram"]
+        for name in sorted(histograms):
+            buckets, count, total = histograms[name]
+            for bound, cumulative in buckets:
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{prefix}_stage_seconds_bucket{{stage="{name}",le="{le}"}} {cumulative}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{name}"}} {count}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{name}"}} {total!r}')
+        lines += [f"# HELP {prefix}_stage_errors_total Pipeline stage calls that raised.",
+                  f"# TYPE {prefix}_stage_errors_total counter"]
+        lines += [f'{prefix}_stage_errors_total{{stage="{name}"}} {errors.get(name, 0)}' for name in sorted(histograms)]
+        return "\n".join(lines) + "\n"
+
+
+metrics = StageMetrics(enabled=os.environ.get("MATCHER_METRICS", "1") != "0")
+
+
+def _format_value(value):
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def render_prometheus(values=None, prefix="matcher"):
+    """Prometheus text for the stage metrics plus plain values ({name: number}).
+
+    Values named *_total are exported as counters, the rest as gauges.
+    """
+    lines = []
+    for name, value in sorted((values or {}).items()):
+        kind = "counter" if name.endswith("_total") else "gauge"
+        lines += [f"# TYPE {prefix}_{name} {kind}", f"{prefix}_{name} {_format_value(value)}"]
+    return ("\n".join(lines) + "\n" if lines else "") + metrics.render_prometheus(prefix)
+
+
+class StageTimer:
+    """Context manager recording the wall time of its block under a stage name."""
+
+    __slots__ = ("name", "_start")
+
+    def __init__(self, name):
+        self.name = name
+        self._start = None
+
+    def __enter__(self):
+        if metrics.enabled:
+            self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._start is not None:
+            metrics.observe(self.name, time.perf_counter() - self._start, failed=exc_type is not None)
+        return False
+
+
+def stage(name):
+    """Time a block: ``with stage("query"): ...``."""
+    return StageTimer(name)
+
+
+def timed(name):
+    """Decorator timing every call of a function under a stage name."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not metrics.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            failed = True
+            try:
+                result = func(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                metrics.observe(name, time.perf_counter() - start, failed)
+        return wrapper
+    return decorate
@@ -0,0 +1,107 @@
+"""
+Storage backends for match results.
+
+Matches are written in chunked multi-row upserts keyed on
+(mentee_id, mentor_id). Writes are idempotent: re-running a match refreshes
+the match_score of a pair that is already stored but never duplicates it or
+resets a status the mentee has already changed (e.g. "requested").
+
+SupabaseMatchStore writes to the production ``matches`` table;
+SQLiteMatchStore implements the same interface on a local or in-memory
+SQLite database for tests and benchmarks.
+"""
+import sqlite3
+
+from instrumentation import timed
+
+DEFAULT_CHUNK_SIZE = 500
+
+
+def match_rows(mentee_id, mentor_matches, status="pending"):
+    """Rows for the matches table from the match dicts of one mentee."""
+    return [{
+        "mentee_id": mentee_id,
+        "mentor_id": match['id'],
+        "match_score": float(match['match_score']),
+        "status": status,
+    } for match in mentor_matches]
+
+
+def frame_match_rows(matches, status="pending"):
+    """Rows for the matches table from a columnar (mentee_id, mentor_id, score) frame."""
+    return [{
+        "mentee_id": mentee_id,
+        "mentor_id": mentor_id,
+        "match_score": float(score),
+        "status": status,
+    } for mentee_id, mentor_id, score in zip(
+        matches["mentee_id"].tolist(), matches["mentor_id"].tolist(), matches["score"].tolist())]
+
+
+class MatchStore:
+    """Base class: chunked, idempotent upserts of match rows."""
+
+    def __init__(self, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+
+    @timed("persist")
+    def save_matches(self, rows):
+        """Upsert rows in chunks of chunk_size; return the number of rows sent."""
+        for start in range(0, len(rows), self.chunk_size):
+            self._upsert_chunk(rows[start:start + self.chunk_size])
+        return len(rows)
+
+    def get_matches(self, mentee_id):
+        """Stored rows for a mentee, best score first."""
+        raise NotImplementedError
+
+    def _upsert_chunk(self, rows):
+        raise NotImplementedError
+
+
+class SupabaseMatchStore(MatchStore):
+    """Matches stored in the Supabase ``matches`` table."""
+
+    def __init__(self, client, chunk_size=DEFAULT_CHUNK_SIZE, table="matches"):
+        super().__init__(chunk_size)
+        self.client = client
+        self.table = table
+
+    def get_matches(self, mentee_id):
+        response = (self.client.table(self.table).select("*")
+                    .eq("mentee_id", mentee_id).order("match_score", desc=True).execute())
+        return response.data
+
+    def _upsert_chunk(self, rows):
+        # New pairs are inserted with their status, then every pair's score is
+        # updated; the second upsert carries no status, so it is never reset
+        self.client.table(self.table).upsert(
+            rows, on_conflict="mentee_id,mentor_id", ignore_duplicates=True).execute()
+        scores = [{key: row[key] for key in ("mentee_id", "mentor_id", "match_score")} for row in rows]
+        self.client.table(self.table).upsert(scores, on_conflict="mentee_id,mentor_id").execute()
+
+
+class SQLiteMatchStore(MatchStore):
+    """Matches stored in SQLite; defaults to an in-memory database."""
+
+    def __init__(self, path=":memory:", chunk_size=DEFAULT_CHUNK_SIZE):
+        super().__init__(chunk_size)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS matches ("
+            " mentee_id, mentor_id, match_score REAL, status TEXT,"
+            " PRIMARY KEY (mentee_id, mentor_id))")
+
+    def get_matches(self, mentee_id):
+        cursor = self.connection.execute(
+            "SELECT mentee_id, mentor_id, match_score, status FROM matches"
+            " WHERE mentee_id = ? ORDER BY match_score DESC", (mentee_id,))
+        columns = [c[0] for c in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def _upsert_chunk(self, rows):
+        with self.connection:
+            self.connection.executemany(
+                "INSERT INTO matches (mentee_id, mentor_id, match_score, status)"
+                " VALUES (:mentee_id, :mentor_id, :match_score, :status)"
+                " ON CONFLICT (mentee_id, mentor_id) DO UPDATE SET match_score = excluded.match_score", rows)
@@ -0,0 +1,212 @@
+"""
+Materialized top-k match table with reverse-neighbor invalidation.
+
+MatchTable keeps the k nearest mentors (positions and distances) of every
+mentee row a MentorMatcher has been asked about. Rows are filled lazily, a
+block of missing rows per kneighbors call, and then read in O(1). Alongside
+the table, `reverse` maps each mentor position to the mentee rows that list
+it, so profile changes only touch the rows they can affect:
+
+  - mentee added or re-encoded: its row is dropped and refilled on next read
+  - mentee removed: its row is dropped and the last row takes its place
+  - mentor re-encoded or removed: the rows listing it are dropped
+  - mentor added or re-encoded: its distances to the filled rows are
+    computed in one vectorized pass, and it is merged into every row whose
+    k-th distance it beats
+
+A filled row is always the top-k the index would return for it (up to the
+order of exact ties). Every change to a row gives it a new version number,
+unique across tables, so caches in front of the table (LRUCache) can tell
+when an entry is stale without being notified.
+"""
+import collections
+import itertools
+import threading
+
+import numpy as np
+
+from neighbor_index import nearest, sq_distances
+
+# Row versions are drawn from one counter, so no two tables hand out the same one
+_versions = itertools.count(1)
+
+
+class MatchTable:
+    """Top-k mentor positions and distances per mentee row of a MentorMatcher, filled on demand."""
+
+    def __init__(self, matcher, k=5, max_block_bytes=64 * 2**20):
+        self.matcher = matcher
+        self.k = k
+        self.max_block_bytes = max_block_bytes
+        self.reverse = collections.defaultdict(set)
+        self._indices = np.full((16, k), -1, dtype=np.int64)
+        self._distances = np.full((16, k), np.inf)
+        self._filled = np.zeros(16, dtype=bool)
+        self._versions = np.zeros(16, dtype=np.int64)
+        self.clear()
+
+    @property
+    def n_filled(self):
+        return int(self._filled.sum())
+
+    def clear(self):
+        """Drop every row, e.g. after the matcher was refitted."""
+        self.reverse.clear()
+        self._filled[:] = False
+        self._versions[:] = next(_versions)
+
+    def lookup(self, rows):
+        """(positions, distances) of the top-k mentors of mentee rows, filling missing rows first.
+
+        Rows with fewer than k mentors available are padded with position -1 and distance inf.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        self._reserve(self.matcher.mentees.size)
+        missing = np.unique(rows[~self._filled[rows]])
+        if len(missing):
+            self._fill(missing)
+        return self._indices[rows], self._distances[rows]
+
+    def version(self, row):
+        """Version of a mentee row; it changes whenever the row's matches may have."""
+        self._reserve(row + 1)
+        return int(self._versions[row])
+
+    def mentees_changed(self, rows):
+        """Mentee rows were added or re-encoded: drop them."""
+        self._reserve(self.matcher.mentees.size)
+        self._drop(rows)
+
+    def mentee_removed(self, row, moved):
+        """The mentee at row was removed and the one at `moved` (if any) took its row."""
+        self._drop([row])
+        if moved is not None:
+            if self._filled[moved]:
+                self._store(row, self._indices[moved].copy(), self._distances[moved].copy())
+            self._drop([moved])
+
+    def mentors_changed(self, positions, mentor_rows):
+        """Mentors at positions were added or re-encoded as mentor_rows (CSR, one row per position).
+
+        Rows listing one of them are dropped; every other filled row takes in
+        those that beat its k-th distance.
+        """
+        self._drop(set().union(*(self.reverse.get(pos, ()) for pos in positions)))
+        filled = np.flatnonzero(self._filled)
+        if not len(filled) or not len(positions):
+            return
+        positions = np.asarray(positions, dtype=np.int64)
+        mentees = self.matcher.mentees.matrix[filled]
+        sq_norms = self.matcher.mentees.sq_norms[filled]
+        kth = self._distances[filled, -1]
+        block_rows = max(1, self.max_block_bytes // (8 * len(filled)))
+        entering = collections.defaultdict(list)
+        for start in range(0, len(positions), block_rows):
+            distances = np.sqrt(sq_distances(mentor_rows[start:start + block_rows], mentees, sq_norms))
+            for i, j in zip(*np.nonzero(distances < kth)):
+                entering[filled[j]].append((positions[start + i], distances[i, j]))
+        for row, candidates in entering.items():
+            indices = np.concatenate([self._indices[row], [pos for pos, _ in candidates]])
+            distances = np.concatenate([self._distances[row], [d for _, d in candidates]])
+            top = nearest(distances, self.k)
+            self._store(row, indices[top], distances[top])
+
+    def mentor_removed(self, pos, moved):
+        """The mentor at pos was removed and the one at `moved` (if any) took its position."""
+        self._drop(self.reverse.pop(pos, ()))
+        if moved is not None:
+            rows = self.reverse.pop(moved, set())
+            for row in rows:
+                self._indices[row][self._indices[row] == moved] = pos
+            self.reverse[pos] = rows
+
+    def _fill(self, rows):
+        index = self.matcher.index
+        k = min(self.k, index.size)
+        block_rows = max(1, self.max_block_bytes // (8 * max(index.size, 1)))
+        mentees = self.matcher.mentee_matrix
+        for start in range(0, len(rows), block_rows):
+            block = rows[start:start + block_rows]
+            if k:
+                distances, indices = index.kneighbors(mentees[block], n_neighbors=k)
+            else:
+                distances, indices = np.zeros((len(block), 0)), np.zeros((len(block), 0), dtype=np.int64)
+            for row, row_indices, row_distances in zip(block, indices, distances):
+                self._store(row, row_indices, row_distances)
+
+    def _store(self, row, indices, distances):
+        row = int(row)
+        self._unlink(row)
+        self._indices[row] = -1
+        self._distances[row] = np.inf
+        self._indices[row, :len(indices)] = indices
+        self._distances[row, :len(distances)] = distances
+        for pos in indices.tolist():
+            self.reverse[pos].add(row)
+        self._filled[row] = True
+        self._versions[row] = next(_versions)
+
+    def _drop(self, rows):
+        for row in rows:
+            if self._filled[row]:
+                self._unlink(row)
+                self._filled[row] = False
+            self._versions[row] = next(_versions)
+
+    def _unlink(self, row):
+        if not self._filled[row]:
+            return
+        for pos in self._indices[row].tolist():
+            if pos >= 0 and pos in self.reverse:
+                self.reverse[pos].discard(row)
+                if not self.reverse[pos]:
+                    del self.reverse[pos]
+
+    def _reserve(self, n_rows):
+        if n_rows > len(self._filled):
+            capacity = max(n_rows, 2 * len(self._filled))
+            old = len(self._filled)
+            self._indices = np.resize(self._indices, (capacity, self.k))
+            self._distances = np.resize(self._distances, (capacity, self.k))
+            self._filled = np.resize(self._filled, capacity)
+            self._versions = np.resize(self._versions, capacity)
+            self._filled[old:] = False
+            self._versions[old:] = next(_versions)
+
+
+class LRUCache:
+    """Thread-safe least-recently-used map whose entries hold for one version of their key."""
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        """The value stored for key at this version, else None (stale entries are dropped)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, version, value):
+        with self._lock:
+            self._entries[key] = (version, value)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
@@ -1,93 +1,438 @@
 import pandas as pd
-import numpy as np
-from sklearn.preprocessing import MultiLabelBinarizer
-from sklearn.neighbors import NearestNeighbors
-import matplotlib.pyplot as plt
-from itertools import chain
-from supabase import create_client, Client
+import logging
 import os
-from io import BytesIO
 import base64
+import threading
+import time
 
-# Supabase client setup
-url = os.environ.get("SUPABASE_URL")
-key = os.environ.get("SUPABASE_KEY")
-supabase: Client = create_client(url, key)
+from assignment import assign_mentors
+from db_client import get_client
+from instrumentation import stage, timed
+from match_store import SupabaseMatchStore, frame_match_rows, match_rows
+from match_table import LRUCache
+from mentor_matcher import COST_COLUMNS, MentorMatcher
+from parallel import N_WORKERS
+from preprocessing import BLOCKS, MENTOR_LANGUAGE_SEP, explode_tokens, token_lists
+from visualization import ChartRenderer
+
+# The Supabase client and match store are built on first use (see db_client),
+# so importing this module needs neither credentials nor a network round trip.
+# Callers against another database (e.g. a stub) pass a client explicitly.
+_match_store = None
+
+logger = logging.getLogger(__name__)
+
+# Warm matcher cache; kept current by streaming delta loads
+MATCHER_CACHE_PATH = os.environ.get("MATCHER_CACHE_PATH", "matcher_cache/matcher")
+MENTEE_DB_COLUMNS = {
+    "skills": "stem_skills",
+    "interests": "interests",
+    "field": "desired_field",
+    "age": "age",
+    "languages": "languages",
+    "country": "country_clean",
+}
+MENTOR_DB_COLUMNS = {
+    "skills": "stem_skills",
+    "interests": "interests",
+    "field": "field",
+    "age": "age",
+    "languages": "languages",
+    "country": "country_clean",
+}
+INDEX_BACKEND = os.environ.get("MATCHER_INDEX_BACKEND", "brute")
+_matcher = None
+
+# Held while the process-wide matcher is changed, queried or saved; a threaded
+# server may call into this module from several threads at once. Syncs are
+# serialized by _sync_lock and take matcher_lock only to apply their changes.
+matcher_lock = threading.RLock()
+_sync_lock = threading.RLock()
+# Changes are saved at most this often, on a timer thread, not per request
+SAVE_INTERVAL = float(os.environ.get("MATCHER_SAVE_INTERVAL", "60"))
+_save_timer = None
+# Deleted rows are found by an id-only scan of both tables this often
+RECONCILE_INTERVAL = float(os.environ.get("MATCHER_RECONCILE_INTERVAL", "300"))
+_last_reconcile = None
+# Reads never sync: the first read of a process syncs, then a daemon thread
+# syncs every SYNC_INTERVAL seconds (see current_matcher)
+SYNC_INTERVAL = float(os.environ.get("MATCHER_SYNC_INTERVAL", "30"))
+_sync_thread = None
+
+# Plain lookups are served from the matcher's top-k table (0 turns it off), and
+# assembled responses are cached until the mentee's table row changes
+MATCH_TABLE_K = int(os.environ.get("MATCHER_TABLE_K", "5"))
+match_cache = LRUCache(int(os.environ.get("MATCHER_MATCH_CACHE_SIZE", "4096")))
+
+# Match charts are opt-in and drawn in a worker process, cached per match result
+chart_renderer = ChartRenderer()
+
+# Paginated loading: only the columns the encoder needs, keyset-paged on id.
+# CURSOR_COLUMN is a last-modified timestamp used for "changed since" delta loads.
+PAGE_SIZE = int(os.environ.get("MATCHER_PAGE_SIZE", "1000"))
+CURSOR_COLUMN = os.environ.get("MATCHER_CURSOR_COLUMN", "updated_at")
+MENTEE_LOAD_COLUMNS = ["id", "stem_skills", "interests", "desired_field", "age", "speaking_languages", "country"]
+MENTOR_LOAD_COLUMNS = ["id", "stem_skills", "interests", "field", "age", "speaking_language", "country"]
+
+def get_match_store():
+    """The process-wide match store on the pooled Supabase client."""
+    global _match_store
+    if _match_store is None:
+        _match_store = SupabaseMatchStore(get_client())
+    return _match_store
+
+def __getattr__(name):
+    """Keep the former module attributes `supabase` and `match_store` working, lazily."""
+    if name == "supabase":
+        return get_client()
+    if name == "match_store":
+        return get_match_store()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def _split_languages(value):
+    """Mentees store languages as an array, mentors as a space separated string."""
+    if isinstance(value, str):
+        value = value.split()
+    if not isinstance(value, list):
+        return []
+    return [lang.strip().lower() for lang in value if lang.strip()]
+
+@timed("preprocess")
+def _prepare(frame, language_column):
+    """Normalize a raw page into the columns the encoder expects."""
+    frame['languages'] = token_lists(
+        explode_tokens(frame[language_column], 'languages', sep=MENTOR_LANGUAGE_SEP), len(frame))
+    frame['country_clean'] = frame['country'].str.lower().str.strip()
+    return frame
+
+def prepare_mentees(mentee_data):
+    return _prepare(mentee_data, 'speaking_languages')
+
+def prepare_mentors(mentor_data):
+    return _prepare(mentor_data, 'speaking_language')
+
+def iter_table_pages(table, columns, page_size=PAGE_SIZE, since=None, client=None):
+    """Yield a table as DataFrames of at most page_size rows.
+
+    Pages are fetched with keyset pagination on id, so each query is an index
+    range scan regardless of depth. With `since`, only rows whose CURSOR_COLUMN
+    is newer are returned.
+    """
+    client = client or get_client()
+    last_id = None
+    while True:
+        query = client.table(table).select(",".join(columns + [CURSOR_COLUMN]))
+        if since is not None:
+            query = query.gt(CURSOR_COLUMN, since)
+        if last_id is not None:
+            query = query.gt("id", last_id)
+        with stage("load"):
+            rows = query.order("id").limit(page_size).execute().data
+        if not rows:
+            return
+        yield pd.DataFrame(rows)
+        if len(rows) < page_size:
+            return
+        last_id = rows[-1]["id"]
 
 def load_from_database():
-    """Load mentee and mentor data from Supabase."""
-    print("\n[DEBUG] Loading data from Supabase")
-    
-    # Get mentees
-    response = supabase.table("mentees").select("*").execute()
-    mentee_data = pd.DataFrame(response.data)
-    
-    # Get mentors
-    response = supabase.table("mentors").select("*").execute()
-    mentor_data = pd.DataFrame(response.data)
-    
-    print(f"[DEBUG] Mentee records: {len(mentee_data)}, Mentor records: {len(mentor_data)}")
-    
-    # Make sure arrays are properly handled
-    # The rest of the preprocessing remains similar to your original function
-    # ...
+    """Load the encoder columns of mentees and mentors from Supabase into DataFrames.
 
+    Prefer sync_matcher, which encodes page by page instead of holding both tables.
+    """
+    logger.info("Loading data from Supabase")
+    mentee_data = pd.concat(
+        [prepare_mentees(page) for page in iter_table_pages("mentees", MENTEE_LOAD_COLUMNS)], ignore_index=True)
+    mentor_data = pd.concat(
+        [prepare_mentors(page) for page in iter_table_pages("mentors", MENTOR_LOAD_COLUMNS)], ignore_index=True)
+    logger.info("Mentee records: %d, Mentor records: %d", len(mentee_data), len(mentor_data))
     return mentee_data, mentor_data
 
-def save_match_to_database(mentee_id, mentor_matches):
-    """Save match results to the database."""
-    print(f"\n[DEBUG] Saving matches for mentee {mentee_id}")
-    
-    for match in mentor_matches:
-        # Insert into matches table
-        data = {
-            "mentee_id": mentee_id,
-            "mentor_id": match['id'],  # Assuming you added mentor ID to the match dict
-            "match_score": float(match['match_score']),
-            "status": "pending"
-        }
-        
-        response = supabase.table("matches").insert(data).execute()
-        print(f"[DEBUG] Match saved: {response.data}")
-
-def find_mentors_for_mentee_api(mentee_id):
-    """API-friendly version that returns JSON data."""
-    mentee_data, mentor_data = load_from_database()
-    mentee_features, mentor_features = create_feature_vectors(mentee_data, mentor_data)
-    knn_model = build_knn_model(mentor_features)
-    
-    # Find mentee index by ID
-    mentee_idx = mentee_data[mentee_data['id'] == mentee_id].index[0]
-    
-    matched_mentors = find_mentors_for_mentee(
-        mentee_idx, mentee_features, knn_model, mentor_data, mentee_data
-    )
-    
-    # Create visualization and convert to base64 for embedding
-    buffer = BytesIO()
-    visualize_matches(mentee_data.iloc[mentee_idx]['name'], matched_mentors, save_buffer=buffer)
-    image_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
-    
-    # Save matches to database
-    save_match_to_database(mentee_id, matched_mentors)
-    
-    return {
-        "mentee": mentee_data.iloc[mentee_idx].to_dict(),
+def fetch_profiles(table, ids, client=None):
+    """Full rows for a handful of ids, keyed by id."""
+    client = client or get_client()
+    with stage("load"):
+        rows = client.table(table).select("*").in_("id", list(ids)).execute().data
+    return {row["id"]: row for row in rows}
+
+def _with_match_table(matcher):
+    if MATCH_TABLE_K and matcher.match_table is None:
+        matcher.materialize(MATCH_TABLE_K)
+    return matcher
+
+def _new_matcher():
+    return _with_match_table(
+        MentorMatcher(MENTEE_DB_COLUMNS, MENTOR_DB_COLUMNS, id_column="id", index_backend=INDEX_BACKEND))
+
+def get_matcher():
+    """Return the process-wide matcher, warm-starting from the disk cache if present."""
+    global _matcher
+    with matcher_lock:
+        return _matcher or _load_matcher()
+
+def _load_matcher():
+    global _matcher
+    if _matcher is None:
+        if os.path.exists(MATCHER_CACHE_PATH + ".json"):
+            try:
+                _matcher = _with_match_table(MentorMatcher.load(MATCHER_CACHE_PATH))
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning("Ignoring unreadable matcher cache: %s", e)
+        if _matcher is None:
+            _matcher = _new_matcher()
+    return _matcher
+
+def sync_matcher(full=False, client=None, reconcile=None):
+    """Stream changed rows into the process-wide matcher, one encoded page at a time.
+
+    A cold matcher (or full=True) streams both tables into a new matcher that
+    replaces the current one once loaded; afterwards only rows changed since
+    the stored cursors are fetched. Rows deleted from the database are
+    dropped by an id-only scan of both tables, run when `reconcile` is set
+    or, by default, every RECONCILE_INTERVAL seconds (and on the first sync
+    of a process). Pages are fetched and prepared without matcher_lock; it
+    is only held to apply each page, so lookups are not stalled by the
+    database. Changes are saved on a timer thread (see save_matcher).
+    """
+    global _matcher, _last_reconcile
+    with _sync_lock:
+        matcher = get_matcher()
+        fresh = full or not matcher.is_fitted
+        if fresh:
+            matcher = _new_matcher()
+        changed = 0
+        for table, columns, prepare, upsert in (
+                ("mentees", MENTEE_LOAD_COLUMNS, prepare_mentees, matcher.upsert_mentees),
+                ("mentors", MENTOR_LOAD_COLUMNS, prepare_mentors, matcher.upsert_mentors)):
+            cursor = matcher.cursors.get(table)
+            for page in iter_table_pages(table, columns, since=cursor, client=client):
+                page = prepare(page)
+                page_cursor = page[CURSOR_COLUMN].dropna().max()
+                if isinstance(page_cursor, str) and (cursor is None or page_cursor > cursor):
+                    cursor = page_cursor
+                with matcher_lock:
+                    changed += upsert(page)
+                    matcher.cursors[table] = cursor
+        if fresh:
+            with matcher_lock:
+                _matcher = matcher
+            # A full load has no deleted rows to drop
+            _last_reconcile = time.monotonic()
+        if reconcile is None:
+            reconcile = _last_reconcile is None or time.monotonic() - _last_reconcile >= RECONCILE_INTERVAL
+        if reconcile:
+            changed += _reconcile_deletions(matcher, client)
+            _last_reconcile = time.monotonic()
+        if changed:
+            logger.info("Synced %d changed rows into the matcher", changed)
+            _schedule_save()
+        return matcher
+
+def _sync_loop():
+    while True:
+        time.sleep(SYNC_INTERVAL)
+        try:
+            sync_matcher()
+        except Exception:
+            logger.exception("Background matcher sync failed")
+
+def current_matcher():
+    """The process-wide matcher for reads, kept current by a background sync thread.
+
+    Only the first call of a process syncs inline (and starts the thread);
+    later calls just return the matcher, and lookups of unknown mentees run
+    one delta sync themselves. Take matcher_lock while using it,
+    and not while calling this.
+    """
+    global _sync_thread
+    if _sync_thread is None:
+        with _sync_lock:
+            if _sync_thread is None:
+                sync_matcher()
+                _sync_thread = threading.Thread(target=_sync_loop, name="matcher-sync", daemon=True)
+                _sync_thread.start()
+    return _matcher
+
+def _reconcile_deletions(matcher, client=None):
+    """Drop the matcher's rows whose ids are no longer in the database; return how many.
+
+    Called under _sync_lock, so only lookups run alongside it: the id scan
+    and the comparison need no matcher_lock, only the removals do.
+    """
+    removed = 0
+    for table, known_ids, remove in (("mentees", matcher.mentee_ids, matcher.remove_mentee),
+                                     ("mentors", matcher.mentor_ids, matcher.remove_mentor)):
+        ids = set()
+        for page in iter_table_pages(table, ["id"], client=client):
+            ids.update(page["id"].tolist())
+        gone = [i for i in known_ids if i not in ids]
+        with matcher_lock:
+            for record_id in gone:
+                remove(record_id)
+        removed += len(gone)
+    if removed:
+        logger.info("Dropped %d deleted rows from the matcher", removed)
+    return removed
+
+def _schedule_save():
+    """Save the matcher SAVE_INTERVAL seconds after the first unsaved change."""
+    global _save_timer
+    with matcher_lock:
+        if _save_timer is None:
+            _save_timer = threading.Timer(SAVE_INTERVAL, save_matcher)
+            _save_timer.daemon = True
+            _save_timer.start()
+
+def save_matcher():
+    """Write the process-wide matcher to MATCHER_CACHE_PATH now, replacing a pending timed save."""
+    global _save_timer
+    with matcher_lock:
+        if _save_timer is not None:
+            _save_timer.cancel()
+            _save_timer = None
+        if _matcher is not None and _matcher.is_fitted:
+            _matcher.save(MATCHER_CACHE_PATH)
+
+def flush_matcher():
+    """Save now if a timed save is pending, e.g. before shutting down."""
+    with matcher_lock:
+        if _save_timer is not None:
+            save_matcher()
+
+def save_match_to_database(mentee_id, mentor_matches, store=None):
+    """Save one mentee's match results in a single chunked, idempotent upsert."""
+    store = store or get_match_store()
+    count = store.save_matches(match_rows(mentee_id, mentor_matches))
+    logger.debug("Saved %d matches for mentee %s", count, mentee_id)
+
+def save_batch_matches_to_database(matches, store=None):
+    """Save a columnar (mentee_id, mentor_id, score) batch result in chunked upserts."""
+    store = store or get_match_store()
+    count = store.save_matches(frame_match_rows(matches))
+    logger.info("Saved %d matches for %d mentees", count, matches['mentee_id'].nunique())
+
+def score_breakdowns(matcher, mentee_ids, mentor_ids, weights=None, scores=None):
+    """{block: points the block cost} per aligned (mentee, mentor) pair, in one vectorized pass.
+
+    Given the scores a boosted query returned, each breakdown also carries
+    "boost": the points the boost added (after the cap at 100), so that
+    score + costs - boost == 100.
+    """
+    explained = matcher.explain(mentee_ids, mentor_ids, weights)
+    breakdowns = [dict(zip(BLOCKS, row)) for row in explained[COST_COLUMNS].to_numpy().tolist()]
+    if scores is not None:
+        for breakdown, points in zip(breakdowns, (scores - explained["score"].to_numpy()).tolist()):
+            breakdown["boost"] = points
+    return breakdowns
+
+def match_dicts(mentor_ids, scores, breakdowns, mentors):
+    """Response dicts for matched mentors, given their fetched profiles by id.
+
+    A mentor whose profile is gone (deleted since the last sync) is skipped.
+    """
+    return [{
+        'id': mentor_id,
+        'name': mentors[mentor_id]['name'],
+        'field': mentors[mentor_id]['field'],
+        'skills': mentors[mentor_id]['stem_skills'],
+        'interests': mentors[mentor_id]['interests'],
+        'experience': mentors[mentor_id]['work_experience'],
+        'match_score': float(score),
+        'languages': _split_languages(mentors[mentor_id]['speaking_language']),
+        'country': mentors[mentor_id]['country'],
+        'score_breakdown': breakdown,
+    } for mentor_id, score, breakdown in zip(mentor_ids, scores, breakdowns) if mentor_id in mentors]
+
+def _matched_mentors(mentee_id, filters=None, match_any=False, boost=None, weights=None):
+    """(mentee profile, match dicts, cached) for a mentee's top 5 mentors.
+
+    Unfiltered results come from match_cache while the mentee's top-k table
+    row is unchanged; cached is True for those. The matcher is only synced on
+    this path for a mentee it does not know yet (see current_matcher).
+    """
+    matcher = current_matcher()
+    if not matcher.has_mentee(mentee_id):
+        # Created since the last sync: catch up once before giving up
+        matcher = sync_matcher(reconcile=False)
+    with matcher_lock:
+        cacheable = not filters and not boost and not weights and matcher.match_table is not None
+        if cacheable:
+            version = matcher.match_version(mentee_id)
+            cached = match_cache.get(mentee_id, version)
+            if cached is not None:
+                return cached + (True,)
+        mentor_ids, scores = matcher.match(mentee_id, k=5, filters=filters, match_any=match_any, boost=boost,
+                                           weights=weights)
+        breakdowns = score_breakdowns(matcher, [mentee_id] * len(mentor_ids), mentor_ids, weights,
+                                      scores if boost else None)
+
+    # Only the mentee and the matched mentors are fetched in full; a profile
+    # deleted since the last sync is skipped
+    mentee = fetch_profiles("mentees", [mentee_id]).get(mentee_id)
+    if mentee is None:
+        raise KeyError(f"Unknown mentee id: {mentee_id!r}")
+    mentors = fetch_profiles("mentors", mentor_ids)
+    result = mentee, match_dicts(mentor_ids, scores, breakdowns, mentors)
+    if cacheable:
+        match_cache.put(mentee_id, version, result)
+    return result + (False,)
+
+def find_mentors_for_mentee_api(mentee_id, filters=None, match_any=False, boost=None, include_chart=False,
+                                weights=None):
+    """API-friendly version that returns JSON data.
+
+    filters / match_any / boost restrict or boost mentors sharing the mentee's
+    field, languages or country, and weights overrides the block weights for
+    this query; see MentorMatcher.match. Every match carries a score_breakdown:
+    the points each block cost it (score + costs == 100). With boost it also
+    has a "boost" entry, the points the boost added (score + costs - boost ==
+    100). The response carries no image unless include_chart is set; clients
+    can chart the match scores themselves or fetch the PNG separately with
+    match_chart_api.
+    """
+    mentee, matched_mentors, cached = _matched_mentors(mentee_id, filters, match_any, boost, weights)
+
+    # Save matches to database; a cached result was saved when it was computed
+    if not cached:
+        save_match_to_database(mentee_id, matched_mentors)
+
+    response = {
+        "mentee": mentee,
         "matches": matched_mentors,
-        "visualization": image_base64
     }
+    if include_chart:
+        png = chart_renderer.render(mentee['name'], matched_mentors)
+        response["visualization"] = base64.b64encode(png).decode('utf-8')
+    return response
+
+def match_chart_api(mentee_id):
+    """PNG bar chart of a mentee's current matches, rendered (or served from cache) off the request thread."""
+    mentee, matched_mentors, _ = _matched_mentors(mentee_id)
+    return chart_renderer.render(mentee['name'], matched_mentors)
 
-# Update the visualization function to support in-memory buffers
 def visualize_matches(mentee_name, matched_mentors, save_path=None, save_buffer=None):
     """Create a bar chart visualization for mentor matches."""
-    print(f"\n[DEBUG] Visualizing matches for {mentee_name}")
-    # Same visualization code as before
-    # ...
-    
+    logger.debug("Visualizing matches for %s", mentee_name)
+    png = chart_renderer.render(mentee_name, matched_mentors)
     if save_buffer:
-        plt.savefig(save_buffer, format='png')
-        print(f"[DEBUG] Visualization saved to buffer")
+        save_buffer.write(png)
+        logger.debug("Visualization saved to buffer")
     elif save_path:
-        plt.savefig(save_path)
-        print(f"[DEBUG] Visualization saved to {save_path}")
-    plt.close()
\ No newline at end of file
+        with open(save_path, "wb") as f:
+            f.write(png)
+        logger.info("Visualization saved to %s", save_path)
+
+def match_all_mentees_api(k=5, n_workers=N_WORKERS):
+    """Batch mode: top-k mentors for every mentee as a columnar DataFrame, sharded over n_workers processes."""
+    matcher = sync_matcher()
+    # The batch runs on a copy, so lookups and syncs carry on meanwhile
+    with matcher_lock:
+        snapshot = matcher.snapshot()
+    return snapshot.match_all_mentees(k, n_workers=n_workers)
+
+def assign_mentors_api(capacity, k=10):
+    """Global assignment: each mentee gets at most one mentor, each mentor at most `capacity` mentees.
+
+    The candidate graph is pruned to each mentee's top-k mentors.
+    """
+    return assign_mentors(match_all_mentees_api(k), capacity)
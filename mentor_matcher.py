@@ -0,0 +1,615 @@
+"""
+Long-lived mentor matcher with a versioned on-disk cache.
+
+The matcher holds the encoded (CSR) mentee and mentor matrices, the fitted
+vocabularies and the neighbor index, plus per-row hashes behind a table
+checksum recorded with every save. It can be saved as an ``.npz`` file of
+matrices plus a small JSON vocabulary manifest, so a restarted worker
+warm-starts without re-encoding every row.
+
+Single profiles can be added, updated or removed incrementally: only the new
+row is encoded, unseen skills/languages/countries append columns to the
+layout, and the neighbor index is patched in place. The same path accepts
+whole frames (upsert_mentees / upsert_mentors), so a paginated loader can
+encode each page as it arrives; ``cursors`` records how far such a loader
+has read for delta loads.
+
+The neighbor index backend (exact brute force by default; see
+neighbor_index) is chosen with ``index_backend`` / ``index_params``.
+materialize() adds a top-k table (see match_table) that serves plain
+lookups and is patched on every change instead of being recomputed.
+Lookups take optional query-time block weights, and explain() breaks match
+scores down into the points each block cost (see scoring).
+"""
+import json
+import logging
+import os
+import uuid
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from blocking import BlockingIndex
+from instrumentation import timed
+from match_table import MatchTable
+from neighbor_index import BruteForceIndex, FeatureRows, make_index, nearest
+from parallel import parallel_encode_profiles, parallel_kneighbors
+from preprocessing import (
+    BLOCKS,
+    CSV_MENTEE_COLUMNS,
+    CSV_MENTOR_COLUMNS,
+    column_weights,
+    encode_profiles,
+    encode_tokens,
+    frame_tokens,
+)
+from scoring import block_indicator, block_scales, block_sq_distances, scale_columns, score_breakdown
+
+# Bumped whenever the layout or tokenization changes, so stale caches are rebuilt.
+CACHE_FORMAT_VERSION = 6
+# explain() / match_all_mentees(explain=True) columns: the points each block cost a match
+COST_COLUMNS = [f"{block}_cost" for block in BLOCKS]
+
+logger = logging.getLogger(__name__)
+
+
+def row_hashes(frame, columns, id_column=None):
+    """Hash the id and encoder input columns of every row of a frame."""
+    subset = frame[list(columns.values())].astype(str)
+    ids = frame[id_column] if id_column else frame.index.to_series()
+    subset.insert(0, "_id", ids.astype(str).to_numpy())
+    return pd.util.hash_pandas_object(subset, index=False).to_numpy()
+
+
+def combine_hashes(hashes):
+    """Order-independent table checksum: the wrapping sum of its row hashes."""
+    return int(np.sum(np.asarray(hashes, dtype=np.uint64), dtype=np.uint64))
+
+
+def distance_to_score(distances):
+    """Convert Euclidean distances into the 0-100 match score."""
+    return 100 * (1.0 / (1.0 + np.asarray(distances)))
+
+
+def _csr_arrays(prefix, matrix):
+    return {
+        f"{prefix}_data": matrix.data,
+        f"{prefix}_indices": matrix.indices,
+        f"{prefix}_indptr": matrix.indptr,
+        f"{prefix}_shape": np.array(matrix.shape),
+    }
+
+
+def _csr_from_arrays(prefix, arrays):
+    return sp.csr_matrix(
+        (arrays[f"{prefix}_data"], arrays[f"{prefix}_indices"], arrays[f"{prefix}_indptr"]),
+        shape=tuple(arrays[f"{prefix}_shape"]))
+
+
+class MentorMatcher:
+    """Encoded mentee/mentor matrices and neighbor index kept warm between requests."""
+
+    def __init__(self, mentee_columns=CSV_MENTEE_COLUMNS, mentor_columns=CSV_MENTOR_COLUMNS,
+                 id_column=None, n_neighbors=5, index_backend="brute", index_params=None):
+        self.mentee_columns = dict(mentee_columns)
+        self.mentor_columns = dict(mentor_columns)
+        self.id_column = id_column
+        self.n_neighbors = n_neighbors
+        self.index_backend = index_backend
+        self.index_params = dict(index_params or {})
+        self.columns = []
+        self.column_index = {}
+        self.weights = np.zeros(0)
+        self.mentees = None
+        self.index = None
+        self._blocking = None
+        self._reweighted = None
+        self.match_table = None
+        self.mentee_ids = []
+        self.mentor_ids = []
+        self.data_version = None
+        self.cursors = {}
+        self._mentee_rows = {}
+        self._mentor_rows = {}
+        self._mentee_hashes = {}
+        self._mentor_hashes = {}
+
+    @property
+    def is_fitted(self):
+        return self.index is not None
+
+    @property
+    def mentee_matrix(self):
+        return self.mentees.matrix
+
+    @property
+    def mentor_matrix(self):
+        return self.index.matrix
+
+    @property
+    def checksum(self):
+        """Order-independent checksum of both tables, maintained across incremental updates."""
+        if not self.is_fitted:
+            return None
+        return (f"{combine_hashes(list(self._mentee_hashes.values())):016x}"
+                f"{combine_hashes(list(self._mentor_hashes.values())):016x}")
+
+    def fit(self, mentee_data, mentor_data, data_version=None, n_workers=1):
+        """Fit vocabularies over both tables, encode them and build the neighbor index.
+
+        With n_workers > 1 the token parsing and encoding is sharded over a
+        process pool (parallel.parallel_encode_profiles); the result is the same.
+        """
+        logger.info("Fitting matcher on %d mentees and %d mentors", len(mentee_data), len(mentor_data))
+        if n_workers > 1:
+            columns, mentee_matrix, mentor_matrix = parallel_encode_profiles(
+                mentee_data, mentor_data, self.mentee_columns, self.mentor_columns, n_workers=n_workers)
+        else:
+            columns, mentee_matrix, mentor_matrix = encode_profiles(
+                mentee_data, mentor_data, self.mentee_columns, self.mentor_columns)
+        self._set_columns(columns)
+        self.mentees = FeatureRows(mentee_matrix)
+        self.index = self._make_index(mentor_matrix)
+        self.mentee_ids = self._ids(mentee_data)
+        self.mentor_ids = self._ids(mentor_data)
+        self._mentee_rows = {mentee_id: i for i, mentee_id in enumerate(self.mentee_ids)}
+        self._mentor_rows = {mentor_id: i for i, mentor_id in enumerate(self.mentor_ids)}
+        self._mentee_hashes = dict(zip(
+            self.mentee_ids, row_hashes(mentee_data, self.mentee_columns, self.id_column).tolist()))
+        self._mentor_hashes = dict(zip(
+            self.mentor_ids, row_hashes(mentor_data, self.mentor_columns, self.id_column).tolist()))
+        self.data_version = data_version
+        self.cursors = {}
+        if self.match_table is not None:
+            self.match_table.clear()
+        logger.info("Matcher fitted with %d feature columns", len(self.columns))
+        return self
+
+    def materialize(self, k=5):
+        """Keep a top-k match table: plain lookups for up to k mentors become table reads.
+
+        Rows are filled on first lookup and patched on every mentee or mentor
+        change; see match_table.MatchTable.
+        """
+        self.match_table = MatchTable(self, k)
+        return self.match_table
+
+    def snapshot(self):
+        """Independent copy of the fitted rows, ids and layout, for long batch jobs.
+
+        Costs one copy of both matrices (plus the index build of the backend);
+        later updates to either matcher do not affect the other. The copy has
+        no top-k table, cursors or row hashes.
+        """
+        if not self.is_fitted:
+            raise RuntimeError("Matcher is not fitted")
+        matcher = MentorMatcher(self.mentee_columns, self.mentor_columns, self.id_column, self.n_neighbors,
+                                self.index_backend, self.index_params)
+        matcher._set_columns(list(self.columns))
+        matcher.mentees = FeatureRows(self.mentee_matrix)
+        matcher.index = matcher._make_index(self.mentor_matrix)
+        matcher.mentee_ids = list(self.mentee_ids)
+        matcher.mentor_ids = list(self.mentor_ids)
+        matcher._mentee_rows = dict(self._mentee_rows)
+        matcher._mentor_rows = dict(self._mentor_rows)
+        return matcher
+
+    def match_version(self, mentee_id):
+        """Version of a mentee's (filled) top-k table row; it changes whenever its matches may have."""
+        if mentee_id not in self._mentee_rows:
+            raise KeyError(f"Unknown mentee id: {mentee_id!r}")
+        row = self._mentee_rows[mentee_id]
+        self.match_table.lookup([row])
+        return self.match_table.version(row)
+
+    @timed("query")
+    def match(self, mentee_id, k=5, filters=None, match_any=False, boost=None, weights=None):
+        """Return the ids and match scores of the k nearest mentors for a mentee.
+
+        filters: blocks from blocking.FILTER_BLOCKS in which a mentor must share
+            at least one token with the mentee (in all of them, or in any with
+            match_any). Only those mentors are scored; if fewer than k qualify,
+            the remaining slots go to the nearest other mentors.
+        boost: {block: points} added to the score of mentors sharing a token
+            with the mentee in that block before ranking (capped at 100).
+        weights: {block: weight} overriding preprocessing.BLOCK_WEIGHTS for
+            this query; the stored rows are not re-encoded.
+        Filtered, boosted and re-weighted queries are scored exactly, whatever
+        the index backend.
+        """
+        if not self.is_fitted:
+            raise RuntimeError("Matcher is not fitted")
+        if mentee_id not in self._mentee_rows:
+            raise KeyError(f"Unknown mentee id: {mentee_id!r}")
+        if not filters and not boost:
+            return self._nearest([self._mentee_rows[mentee_id]], k, weights)[0]
+        mentee_vector = self.mentee_matrix[self._mentee_rows[mentee_id]]
+        blocking = self._blocking_index()
+        candidates = blocking.candidates(mentee_vector, filters or (), match_any)
+        logger.debug("Pre-filter kept %d of %d mentors", len(candidates), self.index.size)
+        positions, scores = self._rank(mentee_vector, candidates, k, boost, weights)
+        if len(positions) < k and filters:
+            others = np.setdiff1d(np.arange(self.index.size), candidates, assume_unique=True)
+            more_positions, more_scores = self._rank(mentee_vector, others, k - len(positions), boost, weights)
+            positions = np.concatenate([positions, more_positions])
+            scores = np.concatenate([scores, more_scores])
+        return [self.mentor_ids[i] for i in positions], scores
+
+    def has_mentee(self, mentee_id):
+        return mentee_id in self._mentee_rows
+
+    @timed("query")
+    def match_many(self, mentee_ids, k=5, weights=None):
+        """Top-k (mentor_ids, scores) for several mentees with one vectorized kneighbors call."""
+        if not self.is_fitted:
+            raise RuntimeError("Matcher is not fitted")
+        unknown = [mentee_id for mentee_id in mentee_ids if mentee_id not in self._mentee_rows]
+        if unknown:
+            raise KeyError(f"Unknown mentee ids: {unknown!r}")
+        return self._nearest([self._mentee_rows[mentee_id] for mentee_id in mentee_ids], k, weights)
+
+    def _nearest(self, rows, k, weights=None):
+        """Top-k (mentor_ids, scores) per mentee row, from the match table when it holds k."""
+        if weights:
+            index, column_scales = self._search_index(weights)
+            distances, indices = index.kneighbors(
+                scale_columns(self.mentee_matrix[rows], column_scales), n_neighbors=k)
+        elif self.match_table is not None and k <= self.match_table.k:
+            indices, distances = self.match_table.lookup(rows)
+            k = min(k, self.index.size)
+            indices, distances = indices[:, :k], distances[:, :k]
+        else:
+            distances, indices = self.index.kneighbors(self.mentee_matrix[rows], n_neighbors=k)
+        scores = distance_to_score(distances)
+        return [([self.mentor_ids[i] for i in row_indices], row_scores)
+                for row_indices, row_scores in zip(indices.tolist(), scores)]
+
+    @timed("query")
+    def match_all_mentees(self, k=5, max_block_bytes=64 * 2**20, n_workers=1, weights=None, explain=False):
+        """Top-k mentors for every mentee as one columnar frame.
+
+        Mentees are scored in row blocks so the mentee x mentor distance block
+        stays within roughly max_block_bytes (per worker). With n_workers > 1
+        the mentees are sharded over a process pool sharing the matrices (see
+        parallel); that path scores exactly, whatever the index backend.
+        weights overrides block weights as in match().
+        Returns a DataFrame with columns mentee_id, mentor_id, rank (1-based)
+        and score, k rows per mentee; explain adds the COST_COLUMNS.
+        """
+        if not self.is_fitted:
+            raise RuntimeError("Matcher is not fitted")
+        n_mentees = self.mentees.size
+        k = min(k, self.index.size)
+        block_rows = max(1, max_block_bytes // (8 * max(self.index.size, 1)))
+        logger.info("Matching %d mentees in blocks of %d on %d workers", n_mentees, block_rows, n_workers)
+        index, column_scales = self._search_index(weights)
+        mentee_matrix = self.mentee_matrix
+        if column_scales is not None:
+            mentee_matrix = scale_columns(mentee_matrix, column_scales)
+        if n_workers > 1:
+            distances, indices = parallel_kneighbors(mentee_matrix, index, k, n_workers, block_rows)
+        else:
+            distances = np.empty((n_mentees, k))
+            indices = np.empty((n_mentees, k), dtype=np.int64)
+            for start in range(0, n_mentees, block_rows):
+                stop = min(start + block_rows, n_mentees)
+                distances[start:stop], indices[start:stop] = index.kneighbors(
+                    mentee_matrix[start:stop], n_neighbors=k)
+        matches = pd.DataFrame({
+            "mentee_id": np.repeat(np.asarray(self.mentee_ids), k),
+            "mentor_id": np.asarray(self.mentor_ids)[indices.ravel()],
+            "rank": np.tile(np.arange(1, k + 1), n_mentees),
+            "score": distance_to_score(distances.ravel()),
+        })
+        if explain:
+            costs = np.empty((len(matches), len(BLOCKS)))
+            # Pairs are broken down a bounded number at a time
+            pair_rows = max(1, 65536 // max(k, 1))
+            for start in range(0, n_mentees, pair_rows):
+                stop = min(start + pair_rows, n_mentees)
+                costs[start * k:stop * k] = self._costs(
+                    np.repeat(np.arange(start, stop), k), indices[start:stop].ravel(),
+                    matches["score"].to_numpy()[start * k:stop * k], weights)
+            matches[COST_COLUMNS] = costs
+        return matches
+
+    def explain(self, mentee_ids, mentor_ids, weights=None):
+        """Score breakdown of (mentee, mentor) pairs given as aligned id lists.
+
+        Returns a DataFrame with one row per pair: mentee_id, mentor_id, score
+        and COST_COLUMNS, the points each block cost (score + costs == 100).
+        """
+        unknown = [i for i in mentee_ids if i not in self._mentee_rows] + [
+            i for i in mentor_ids if i not in self._mentor_rows]
+        if unknown:
+            raise KeyError(f"Unknown ids: {unknown!r}")
+        rows = np.array([self._mentee_rows[i] for i in mentee_ids], dtype=np.int64)
+        positions = np.array([self._mentor_rows[i] for i in mentor_ids], dtype=np.int64)
+        block_sq = self._block_sq_distances(rows, positions, weights)
+        scores = distance_to_score(np.sqrt(block_sq.sum(axis=1)))
+        frame = pd.DataFrame({"mentee_id": list(mentee_ids), "mentor_id": list(mentor_ids), "score": scores})
+        frame[COST_COLUMNS] = score_breakdown(block_sq, scores)
+        return frame
+
+    def upsert_mentees(self, frame):
+        """Add new and re-encode existing mentees from a frame, e.g. one loader page."""
+        if not self.is_fitted:
+            self._reset()
+        return self._upsert(frame, self.mentee_columns, self.mentees, self.mentee_ids,
+                            self._mentee_rows, self._mentee_hashes)
+
+    def upsert_mentors(self, frame):
+        """Add new and re-encode existing mentors from a frame, e.g. one loader page."""
+        if not self.is_fitted:
+            self._reset()
+        return self._upsert(frame, self.mentor_columns, self.index, self.mentor_ids,
+                            self._mentor_rows, self._mentor_hashes)
+
+    def add_mentee(self, mentee_id, record):
+        """Encode and append a single mentee given a mapping of mentee columns."""
+        if mentee_id in self._mentee_rows:
+            raise KeyError(f"Mentee id already present: {mentee_id!r}")
+        vector = self._encode_record(record, self.mentee_columns)
+        self._mentee_rows[mentee_id] = self.mentees.append(vector)
+        self.mentee_ids.append(mentee_id)
+        if self.match_table is not None:
+            self.match_table.mentees_changed([self._mentee_rows[mentee_id]])
+        self._mentee_hashes[mentee_id] = self._record_hash(mentee_id, record, self.mentee_columns)
+        self.data_version = None
+
+    def add_mentor(self, mentor_id, record):
+        """Encode and append a single mentor given a mapping of mentor columns."""
+        if mentor_id in self._mentor_rows:
+            raise KeyError(f"Mentor id already present: {mentor_id!r}")
+        vector = self._encode_record(record, self.mentor_columns)
+        self._mentor_rows[mentor_id] = self.index.append(vector)
+        self.mentor_ids.append(mentor_id)
+        if self.match_table is not None:
+            self.match_table.mentors_changed([self._mentor_rows[mentor_id]], vector)
+        self._mentor_hashes[mentor_id] = self._record_hash(mentor_id, record, self.mentor_columns)
+        self.data_version = None
+
+    def update_mentor(self, mentor_id, record):
+        """Re-encode a single mentor in place."""
+        if mentor_id not in self._mentor_rows:
+            raise KeyError(f"Unknown mentor id: {mentor_id!r}")
+        vector = self._encode_record(record, self.mentor_columns)
+        self.index.update(self._mentor_rows[mentor_id], vector)
+        if self.match_table is not None:
+            self.match_table.mentors_changed([self._mentor_rows[mentor_id]], vector)
+        self._mentor_hashes[mentor_id] = self._record_hash(mentor_id, record, self.mentor_columns)
+        self.data_version = None
+
+    def remove_mentor(self, mentor_id):
+        """Drop a single mentor from the index."""
+        if mentor_id not in self._mentor_rows:
+            raise KeyError(f"Unknown mentor id: {mentor_id!r}")
+        pos = self._mentor_rows.pop(mentor_id)
+        moved = self.index.remove(pos)
+        if moved is not None:
+            moved_id = self.mentor_ids[moved]
+            self.mentor_ids[pos] = moved_id
+            self._mentor_rows[moved_id] = pos
+        self.mentor_ids.pop()
+        del self._mentor_hashes[mentor_id]
+        if self.match_table is not None:
+            self.match_table.mentor_removed(pos, moved)
+        self.data_version = None
+
+    def remove_mentee(self, mentee_id):
+        """Drop a single mentee."""
+        if mentee_id not in self._mentee_rows:
+            raise KeyError(f"Unknown mentee id: {mentee_id!r}")
+        row = self._mentee_rows.pop(mentee_id)
+        moved = self.mentees.remove(row)
+        if moved is not None:
+            moved_id = self.mentee_ids[moved]
+            self.mentee_ids[row] = moved_id
+            self._mentee_rows[moved_id] = row
+        self.mentee_ids.pop()
+        del self._mentee_hashes[mentee_id]
+        if self.match_table is not None:
+            self.match_table.mentee_removed(row, moved)
+        self.data_version = None
+
+    @timed("persist")
+    def save(self, path):
+        """Write ``<path>.npz`` and ``<path>.json``.
+
+        Each file is replaced atomically, one after the other. Both carry the
+        same random generation, so load() rejects a pair left by a crash
+        between the two replacements.
+        """
+        if not self.is_fitted:
+            raise RuntimeError("Matcher is not fitted")
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        generation = uuid.uuid4().hex
+        manifest = {
+            "format_version": CACHE_FORMAT_VERSION,
+            "generation": generation,
+            "checksum": self.checksum,
+            "data_version": self.data_version,
+            "cursors": self.cursors,
+            "id_column": self.id_column,
+            "n_neighbors": self.n_neighbors,
+            "index_backend": self.index_backend,
+            "index_params": self.index_params,
+            "mentee_columns": self.mentee_columns,
+            "mentor_columns": self.mentor_columns,
+            "columns": [list(column) for column in self.columns],
+            "mentee_ids": self.mentee_ids,
+            "mentor_ids": self.mentor_ids,
+        }
+        with open(path + ".npz.tmp", "wb") as f:
+            np.savez(
+                f,
+                **_csr_arrays("mentee", self.mentee_matrix),
+                **_csr_arrays("mentor", self.mentor_matrix),
+                mentee_hashes=np.array([self._mentee_hashes[i] for i in self.mentee_ids], dtype=np.uint64),
+                mentor_hashes=np.array([self._mentor_hashes[i] for i in self.mentor_ids], dtype=np.uint64),
+                generation=np.array(generation),
+            )
+        with open(path + ".json.tmp", "w") as f:
+            json.dump(manifest, f)
+        os.replace(path + ".npz.tmp", path + ".npz")
+        os.replace(path + ".json.tmp", path + ".json")
+        logger.info("Matcher cache saved to %s", path)
+
+    @classmethod
+    @timed("load")
+    def load(cls, path):
+        """Warm-start a matcher from a cache written by save()."""
+        with open(path + ".json") as f:
+            manifest = json.load(f)
+        if manifest.get("format_version") != CACHE_FORMAT_VERSION:
+            raise ValueError(f"Unsupported matcher cache format: {manifest.get('format_version')}")
+        matcher = cls(manifest["mentee_columns"], manifest["mentor_columns"],
+                      manifest["id_column"], manifest["n_neighbors"],
+                      manifest.get("index_backend", "brute"), manifest.get("index_params"))
+        matcher._set_columns([tuple(column) for column in manifest["columns"]])
+        matcher.mentee_ids = manifest["mentee_ids"]
+        matcher.mentor_ids = manifest["mentor_ids"]
+        with np.load(path + ".npz") as arrays:
+            if "generation" not in arrays or str(arrays["generation"]) != manifest.get("generation"):
+                raise ValueError("Matcher cache files are from different saves")
+            matcher.mentees = FeatureRows(_csr_from_arrays("mentee", arrays))
+            matcher.index = matcher._make_index(_csr_from_arrays("mentor", arrays))
+            matcher._mentee_hashes = dict(zip(matcher.mentee_ids, arrays["mentee_hashes"].tolist()))
+            matcher._mentor_hashes = dict(zip(matcher.mentor_ids, arrays["mentor_hashes"].tolist()))
+        matcher._mentee_rows = {mentee_id: i for i, mentee_id in enumerate(matcher.mentee_ids)}
+        matcher._mentor_rows = {mentor_id: i for i, mentor_id in enumerate(matcher.mentor_ids)}
+        matcher.data_version = manifest["data_version"]
+        matcher.cursors = manifest["cursors"]
+        logger.info("Matcher cache loaded from %s", path)
+        return matcher
+
+    def _set_columns(self, columns):
+        self.columns = columns
+        self.column_index = {column: i for i, column in enumerate(columns)}
+        self.weights = column_weights(columns)
+        self._block_indicator = block_indicator(columns)
+        self._column_blocks = np.array([BLOCKS.index(block) for block, _ in columns], dtype=np.int64)
+
+    def _make_index(self, mentor_matrix):
+        self._blocking = None
+        return make_index(mentor_matrix, self.index_backend, self.n_neighbors, self.columns, **self.index_params)
+
+    def _blocking_index(self):
+        """Inverted lists over the mentor rows, rebuilt after the rows change."""
+        if self._blocking is None or self._blocking.version != self.index.version:
+            self._blocking = BlockingIndex(self.index, self.columns)
+        return self._blocking
+
+    def _search_index(self, weights=None):
+        """(index, column scales) to search with; for block weights, an exact index over re-weighted rows.
+
+        The re-weighted index is kept until the weights or the mentor rows change.
+        """
+        if not weights:
+            return self.index, None
+        scales = block_scales(weights)
+        key = (tuple(scales), id(self.index), self.index.version, len(self.columns))
+        if self._reweighted is None or self._reweighted[0] != key:
+            column_scales = scales[self._column_blocks]
+            index = BruteForceIndex(scale_columns(self.index.matrix, column_scales), self.n_neighbors)
+            self._reweighted = (key, index, column_scales)
+        return self._reweighted[1], self._reweighted[2]
+
+    def _block_sq_distances(self, rows, positions, weights=None):
+        """Per-block squared distances of aligned mentee rows and mentor positions."""
+        block_sq = block_sq_distances(self.mentee_matrix[rows], self.index.take(positions), self._block_indicator)
+        if weights:
+            block_sq *= block_scales(weights) ** 2
+        return block_sq
+
+    def _costs(self, rows, positions, scores, weights=None):
+        """COST_COLUMNS values of aligned (mentee row, mentor position) pairs with their scores."""
+        return score_breakdown(self._block_sq_distances(rows, positions, weights), scores)
+
+    def _rank(self, mentee_vector, positions, k, boost=None, weights=None):
+        """Top-k (positions, scores) among the given mentor positions, with optional block boosts."""
+        index, column_scales = self._search_index(weights)
+        query = mentee_vector if column_scales is None else scale_columns(mentee_vector, column_scales)
+        scores = distance_to_score(index.distances_to(query.toarray().ravel(), positions))
+        for block, points in (boost or {}).items():
+            shared = self._blocking_index().shares(mentee_vector, block, positions)
+            scores = np.minimum(scores + points * shared, 100.0)
+        top = nearest(-scores, k)
+        return positions[top], scores[top]
+
+    def _ids(self, frame):
+        ids = frame[self.id_column] if self.id_column else frame.index
+        return [i.item() if isinstance(i, np.generic) else i for i in ids]
+
+    def _record_frame(self, record_id, record, columns):
+        frame = pd.DataFrame([{col: record[col] for col in columns.values()}], index=[record_id])
+        if self.id_column:
+            frame[self.id_column] = [record_id]
+        return frame
+
+    def _record_hash(self, record_id, record, columns):
+        return int(row_hashes(self._record_frame(record_id, record, columns), columns, self.id_column)[0])
+
+    def _encode_record(self, record, columns):
+        """Encode one record, appending columns for tokens not yet in the vocabulary."""
+        return self._encode_frame(self._record_frame(None, record, columns), columns)
+
+    @timed("encode")
+    def _encode_frame(self, frame, columns):
+        """Encode a frame, appending columns for tokens not yet in the vocabulary."""
+        tokens = frame_tokens(frame, columns)
+        self._grow(tokens)
+        return encode_tokens(tokens, frame[columns["age"]], self.column_index, self.weights)
+
+    def _grow(self, tokens):
+        """Append (sorted) columns for tokens not yet in the vocabulary."""
+        new_columns = []
+        for block, block_tokens in tokens.items():
+            unseen = [t for t in pd.unique(block_tokens) if (block, t) not in self.column_index]
+            new_columns.extend((block, t) for t in sorted(unseen))
+        if new_columns:
+            logger.debug("Growing vocabulary by %d columns", len(new_columns))
+            self._set_columns(self.columns + new_columns)
+            self.mentees.widen(len(self.columns))
+            self.index.widen(len(self.columns), self.columns)
+
+    def _reset(self):
+        """Empty matcher with only the age column, ready for upserts."""
+        self._set_columns([("age", "age")])
+        self.mentees = FeatureRows(sp.csr_matrix((0, 1)))
+        self.index = self._make_index(sp.csr_matrix((0, 1)))
+        self.mentee_ids, self.mentor_ids = [], []
+        self._mentee_rows, self._mentor_rows = {}, {}
+        self._mentee_hashes, self._mentor_hashes = {}, {}
+        self.cursors = {}
+        if self.match_table is not None:
+            self.match_table.clear()
+
+    def _upsert(self, frame, columns, store, ids, positions, hashes):
+        matrix = self._encode_frame(frame, columns)
+        frame_ids = self._ids(frame)
+        new_rows = []
+        for i, (record_id, row_hash) in enumerate(
+                zip(frame_ids, row_hashes(frame, columns, self.id_column).tolist())):
+            if record_id in positions:
+                store.update(positions[record_id], matrix[i])
+            else:
+                new_rows.append(i)
+            hashes[record_id] = row_hash
+        if new_rows:
+            start = store.extend(matrix[new_rows])
+            for offset, i in enumerate(new_rows):
+                positions[frame_ids[i]] = start + offset
+                ids.append(frame_ids[i])
+        self.data_version = None
+        if self.match_table is not None:
+            # A repeated id keeps its last row, as in the store
+            last = {positions[record_id]: i for i, record_id in enumerate(frame_ids)}
+            if store is self.index:
+                self.match_table.mentors_changed(list(last), matrix[list(last.values())])
+            else:
+                self.match_table.mentees_changed(list(last))
+        return len(frame)
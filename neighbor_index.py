@@ -0,0 +1,588 @@
+"""
+Neighbor index backends for the mentor matrix.
+
+Every backend is a FeatureRows store (so MentorMatcher can append, update,
+remove and widen rows in place) with the NearestNeighbors.kneighbors
+contract: (distances, indices) sorted by Euclidean distance.
+
+  - brute:     exact; one sparse product per query block (BLAS-free CSR)
+  - ball_tree: exact; sklearn BallTree over the densified rows, rebuilt
+               lazily after the rows change
+  - lsh:       approximate; p-stable random-projection LSH with exact
+               re-ranking of the bucket candidates, hashes patched in place
+  - packed:    exact; token blocks as bitsets and a float32 age per row,
+               scanned with an XOR / popcount kernel (needs the column layout)
+
+Backends are selected by name through make_index / INDEX_BACKENDS.
+"""
+import numpy as np
+import scipy.sparse as sp
+
+from instrumentation import timed
+from preprocessing import BLOCK_WEIGHTS, BLOCKS
+
+
+def nearest(distances, k):
+    """Positions of the k smallest distances, nearest first; ties keep their input order."""
+    k = min(k, len(distances))
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    top = np.argpartition(distances, k - 1)[:k]
+    return top[np.argsort(distances[top], kind="stable")]
+
+
+def sq_distances(X, matrix, sq_norms):
+    """Squared Euclidean distances from each query row of X to every row of a CSR matrix.
+
+    sq_norms are the matrix's squared row norms. Returns a dense (n_queries, n_rows) block.
+    """
+    if sp.issparse(X):
+        X = sp.csr_matrix(X)
+        query_norms = np.asarray(X.multiply(X).sum(axis=1)).ravel()
+        sq = (X @ matrix.T).toarray()
+    else:
+        X = np.atleast_2d(X)
+        query_norms = np.einsum("ij,ij->i", X, X)
+        sq = np.ascontiguousarray(np.asarray(matrix @ X.T).T)
+    # |q|^2 + |x|^2 - 2 q.x, built in place on the products block
+    sq *= -2
+    sq += query_norms[:, None]
+    sq += sq_norms[None, :]
+    return np.maximum(sq, 0, out=sq)
+
+
+def brute_kneighbors(X, matrix, sq_norms, k):
+    """Exact k nearest rows of a CSR matrix (with its squared row norms) for each query row of X.
+
+    Returns (distances, indices) sorted by distance, nearest first.
+    """
+    sq = sq_distances(X, matrix, sq_norms)
+    indices = np.argpartition(sq, k - 1, axis=1)[:, :k]
+    order = np.argsort(np.take_along_axis(sq, indices, axis=1), axis=1, kind="stable")
+    indices = np.take_along_axis(indices, order, axis=1)
+    return np.sqrt(np.take_along_axis(sq, indices, axis=1)), indices
+
+
+class FeatureRows:
+    """Growable CSR row store with in-place update, swap-remove and free column widening."""
+
+    def __init__(self, matrix):
+        matrix = sp.csr_matrix(matrix)
+        matrix.sort_indices()
+        self.size, self.n_columns = matrix.shape
+        self.nnz = matrix.nnz
+        # indptr and indices share one dtype (int32 until nnz needs int64), so
+        # scipy wraps them in .matrix without a cast copy
+        index_dtype = np.int32 if self.nnz < 2**31 else np.int64
+        self._indptr = np.zeros(max(self.size, 16) + 1, dtype=index_dtype)
+        self._indptr[:self.size + 1] = matrix.indptr
+        self._indices = np.zeros(max(self.nnz, 64), dtype=index_dtype)
+        self._indices[:self.nnz] = matrix.indices
+        self._data = np.zeros(len(self._indices))
+        self._data[:self.nnz] = matrix.data
+        self._sq_norms = np.zeros(len(self._indptr) - 1)
+        self._sq_norms[:self.size] = np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel()
+        # Bumped on every change, so derived structures can tell they are stale
+        self.version = 0
+
+    @property
+    def matrix(self):
+        """CSR view over the live rows; no data is copied."""
+        return sp.csr_matrix(
+            (self._data[:self.nnz], self._indices[:self.nnz], self._indptr[:self.size + 1]),
+            shape=(self.size, self.n_columns))
+
+    @property
+    def sq_norms(self):
+        return self._sq_norms[:self.size]
+
+    @property
+    def nbytes(self):
+        """Bytes allocated for the row arrays, spare capacity included."""
+        return self._indptr.nbytes + self._indices.nbytes + self._data.nbytes + self._sq_norms.nbytes
+
+    def take(self, positions):
+        """CSR copy of the rows at positions."""
+        return self.matrix[positions]
+
+    def append(self, row):
+        """Append a 1 x n_columns CSR row and return its position."""
+        return self.extend(row)
+
+    def extend(self, rows):
+        """Append a block of CSR rows in O(block nnz); return the position of the first."""
+        rows = sp.csr_matrix(rows)
+        rows.sort_indices()
+        start, n_new = self.size, rows.shape[0]
+        if self.size + n_new >= len(self._indptr):
+            capacity = max(self.size + n_new + 1, 2 * len(self._indptr))
+            self._indptr = np.resize(self._indptr, capacity)
+            self._sq_norms = np.resize(self._sq_norms, capacity - 1)
+        self._reserve(self.nnz + rows.nnz)
+        self._indices[self.nnz:self.nnz + rows.nnz] = rows.indices
+        self._data[self.nnz:self.nnz + rows.nnz] = rows.data
+        self._indptr[start + 1:start + n_new + 1] = self.nnz + rows.indptr[1:]
+        self._sq_norms[start:start + n_new] = np.asarray(rows.multiply(rows).sum(axis=1)).ravel()
+        self.size += n_new
+        self.nnz += rows.nnz
+        self.version += 1
+        return start
+
+    def update(self, pos, row):
+        """Replace a row; rows after it are shifted only if its nnz changes."""
+        start, end = int(self._indptr[pos]), int(self._indptr[pos + 1])
+        delta = row.nnz - (end - start)
+        if delta:
+            self._reserve(self.nnz + delta)
+            self._indices[end + delta:self.nnz + delta] = self._indices[end:self.nnz]
+            self._data[end + delta:self.nnz + delta] = self._data[end:self.nnz]
+            self._indptr[pos + 1:self.size + 1] += delta
+            self.nnz += delta
+        self._indices[start:start + row.nnz] = row.indices
+        self._data[start:start + row.nnz] = row.data
+        self._sq_norms[pos] = np.dot(row.data, row.data)
+        self.version += 1
+
+    def remove(self, pos):
+        """Remove a row by moving the last row into its slot; return the moved row's old position."""
+        last = self.size - 1
+        moved = None
+        if pos != last:
+            self.update(pos, self.matrix[last])
+            moved = last
+        self.nnz = int(self._indptr[last])
+        self.size = last
+        self.version += 1
+        return moved
+
+    def distances_to(self, query, positions):
+        """Euclidean distances from one dense query vector to the rows at positions."""
+        sq = self.matrix[positions] @ query
+        sq *= -2
+        sq += query @ query
+        sq += self.sq_norms[positions]
+        return np.sqrt(np.maximum(sq, 0, out=sq))
+
+    def widen(self, n_columns, columns=None):
+        """Append empty columns up to n_columns; stored rows are unchanged.
+
+        columns is the full (block, token) layout, for stores that keep per-block state.
+        """
+        self.n_columns = n_columns
+        self.version += 1
+
+    def _reserve(self, nnz):
+        if nnz >= 2**31 and self._indices.dtype != np.int64:
+            self._indptr = self._indptr.astype(np.int64)
+            self._indices = self._indices.astype(np.int64)
+        if nnz > len(self._indices):
+            capacity = max(nnz, 2 * len(self._indices))
+            self._indices = np.resize(self._indices, capacity)
+            self._data = np.resize(self._data, capacity)
+
+
+class BruteForceIndex(FeatureRows):
+    """Exact Euclidean neighbor index over a FeatureRows store, patched in place."""
+
+    def __init__(self, matrix, n_neighbors=5):
+        super().__init__(matrix)
+        self.n_neighbors = n_neighbors
+
+    def kneighbors(self, X, n_neighbors=None):
+        """Same contract as NearestNeighbors.kneighbors: (distances, indices) sorted by distance.
+
+        X may be a dense array or a sparse matrix; sparse queries stay sparse.
+        """
+        return brute_kneighbors(X, self.matrix, self.sq_norms, min(n_neighbors or self.n_neighbors, self.size))
+
+
+class BallTreeIndex(FeatureRows):
+    """Exact Euclidean index on sklearn's BallTree, rebuilt on the next query after a change.
+
+    The tree works on dense rows, so memory is n_rows x n_columns floats.
+    """
+
+    def __init__(self, matrix, n_neighbors=5, leaf_size=40):
+        super().__init__(matrix)
+        self.n_neighbors = n_neighbors
+        self.leaf_size = leaf_size
+        self._tree = None
+        self._tree_version = None
+
+    def kneighbors(self, X, n_neighbors=None):
+        k = min(n_neighbors or self.n_neighbors, self.size)
+        if self._tree_version != self.version:
+            from sklearn.neighbors import BallTree
+
+            self._tree = BallTree(self.matrix.toarray(), leaf_size=self.leaf_size)
+            self._tree_version = self.version
+        X = X.toarray() if sp.issparse(X) else np.atleast_2d(X)
+        return self._tree.query(X, k=k)
+
+    @property
+    def nbytes(self):
+        """Row arrays plus the tree's dense copy of the rows, once built."""
+        return super().nbytes + (self._tree.get_arrays()[0].nbytes if self._tree is not None else 0)
+
+
+class LSHIndex(FeatureRows):
+    """Approximate Euclidean index: p-stable random-projection LSH with exact re-ranking.
+
+    Each of n_tables tables hashes a row to floor((a.x + b) / bucket_width) on
+    n_projections Gaussian projections. A query's candidates are the rows that
+    share its bucket in any table; they are re-ranked exactly. Queries with
+    fewer than k candidates fall back to an exact scan, so k results are always
+    returned. Row hashes are patched in place; the per-table bucket order is
+    re-sorted lazily on the next query after a change.
+
+    Recall depends on bucket_width relative to the distances between rows, so
+    by default it is bucket_scale times the RMS norm of the rows present when
+    the index is built (or of the first rows added to an empty one). Narrower
+    buckets or more projections per table shrink the candidate sets: faster,
+    but true neighbors are missed. With the defaults, on the bundled profiles
+    and on synthetic populations of 20k-100k rows, recall@5 is >= 0.998 and
+    no score is off by more than 0.01 points, at about 0.7x the brute-force
+    query time for 100k rows. Re-check recall with benchmarks/bench_index.py
+    before changing the defaults or the block weights.
+    """
+
+    def __init__(self, matrix, n_neighbors=5, n_tables=16, n_projections=4, bucket_width=None, bucket_scale=4.0,
+                 seed=0):
+        super().__init__(matrix)
+        self.n_neighbors = n_neighbors
+        self.n_tables = n_tables
+        self.n_projections = n_projections
+        self.bucket_scale = bucket_scale
+        self.bucket_width = bucket_width
+        self._rng = np.random.default_rng(seed)
+        # Offsets b are drawn in units of the bucket width
+        self._offsets = self._rng.uniform(0, 1, n_tables * n_projections)
+        # Odd multipliers that fold one table's bucket coordinates into a single key
+        self._mix = self._rng.integers(1, 2**62, n_projections, dtype=np.uint64) | np.uint64(1)
+        self._projections = np.zeros((0, n_tables * n_projections))
+        self._grow_projections()
+        self._keys = np.zeros((len(self._sq_norms), n_tables), dtype=np.uint64)
+        self._fit_width(self.sq_norms)
+        self._keys[:self.size] = self._hash(self.matrix)
+        self._buckets = None
+
+    def _fit_width(self, sq_norms):
+        """Set the bucket width from the first rows seen, unless one was given."""
+        if self.bucket_width is None and len(sq_norms):
+            self.bucket_width = self.bucket_scale * max(float(np.sqrt(np.mean(sq_norms))), 1e-12)
+
+    def extend(self, rows):
+        rows = sp.csr_matrix(rows)
+        start = super().extend(rows)
+        self._fit_width(self.sq_norms)
+        if len(self._keys) < len(self._sq_norms):
+            self._keys = np.resize(self._keys, (len(self._sq_norms), self.n_tables))
+        self._keys[start:self.size] = self._hash(rows)
+        self._buckets = None
+        return start
+
+    def update(self, pos, row):
+        super().update(pos, row)
+        self._keys[pos] = self._hash(row)[0]
+        self._buckets = None
+
+    def remove(self, pos):
+        moved = super().remove(pos)
+        self._buckets = None
+        return moved
+
+    @property
+    def nbytes(self):
+        """Row arrays plus the per-table hash keys and the projections."""
+        return super().nbytes + self._keys.nbytes + self._projections.nbytes
+
+    def widen(self, n_columns, columns=None):
+        super().widen(n_columns)
+        # Stored rows are zero in the new columns, so their hashes are unchanged
+        self._grow_projections()
+
+    def kneighbors(self, X, n_neighbors=None):
+        k = min(n_neighbors or self.n_neighbors, self.size)
+        X = sp.csr_matrix(X if sp.issparse(X) else np.atleast_2d(X))
+        if not k:
+            return np.zeros((X.shape[0], 0)), np.zeros((X.shape[0], 0), dtype=np.int64)
+        if self._buckets is None:
+            keys = self._keys[:self.size]
+            orders = [np.argsort(keys[:, t], kind="stable") for t in range(self.n_tables)]
+            self._buckets = [(order, keys[order, t]) for t, order in enumerate(orders)]
+        query_keys = self._hash(X)
+        bounds = [(order, np.searchsorted(sorted_keys, query_keys[:, t], side="left"),
+                   np.searchsorted(sorted_keys, query_keys[:, t], side="right"))
+                  for t, (order, sorted_keys) in enumerate(self._buckets)]
+        is_candidate = np.zeros(self.size, dtype=bool)
+        distances = np.empty((X.shape[0], k))
+        indices = np.empty((X.shape[0], k), dtype=np.int64)
+        for i in range(X.shape[0]):
+            is_candidate[:] = False
+            for order, lo, hi in bounds:
+                is_candidate[order[lo[i]:hi[i]]] = True
+            candidates = np.flatnonzero(is_candidate)
+            if len(candidates) < k:
+                candidates = np.arange(self.size)
+            candidate_distances = self.distances_to(X[i].toarray().ravel(), candidates)
+            top = nearest(candidate_distances, k)
+            distances[i], indices[i] = candidate_distances[top], candidates[top]
+        return distances, indices
+
+    def _grow_projections(self):
+        n_new = self.n_columns - len(self._projections)
+        if n_new > 0:
+            self._projections = np.vstack(
+                [self._projections, self._rng.standard_normal((n_new, len(self._offsets)))])
+
+    def _hash(self, rows, block_rows=65536):
+        """Bucket key of every row in every table, shape (n_rows, n_tables).
+
+        Rows are projected in blocks to bound the dense projection buffer.
+        """
+        keys = np.empty((rows.shape[0], self.n_tables), dtype=np.uint64)
+        for start in range(0, rows.shape[0], block_rows):
+            projected = np.asarray(rows[start:start + block_rows] @ self._projections)
+            buckets = np.floor(projected / self.bucket_width + self._offsets).astype(np.int64)
+            buckets = buckets.view(np.uint64).reshape(len(buckets), self.n_tables, self.n_projections)
+            keys[start:start + len(buckets)] = (buckets * self._mix).sum(axis=2, dtype=np.uint64)
+        return keys
+
+
+_BYTE_POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1).astype(np.uint8)
+
+
+def _popcount(words):
+    """Set bits per uint64 word, as uint8."""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(words)
+    # numpy < 2.0: per-byte table lookup
+    counts = _BYTE_POPCOUNT[words.astype("<u8", copy=False).view(np.uint8)]
+    return counts.reshape(*words.shape, 8).sum(axis=-1, dtype=np.uint8)
+
+
+class PackedIndex:
+    """Exact Euclidean index over bit-packed token blocks and a float32 age column.
+
+    Token columns are 0 / w_b indicators, so for two rows
+    |q - x|^2 = sum_b w_b^2 * popcount(q_b XOR x_b) + (w_age / 100)^2 * (age_q - age_x)^2.
+    Each categorical block is a run of uint64 words (one bit per token) and
+    the age is kept in years as float32, which is exact for whole ages. A scan
+    is an XOR, a popcount and one weighted sum per word, over about 8 bytes
+    per 64 tokens of vocabulary instead of 12 bytes per stored token.
+
+    Same row-store interface as FeatureRows. `matrix` and `sq_norms` are
+    rebuilt from the bits on each access, so pre-filters, parallel batches and
+    saving pay an unpack. A block that outgrows its words is repacked on
+    widen, with spare words for later growth.
+    """
+
+    needs_columns = True
+
+    def __init__(self, matrix, n_neighbors=5, columns=None, scan_rows=65536):
+        if columns is None:
+            raise ValueError("The packed index backend needs the (block, token) column layout")
+        self.n_neighbors = n_neighbors
+        self.scan_rows = scan_rows
+        self._block_words = {}
+        self._layout(columns)
+        bits, ages = self._pack(matrix)
+        self.size = len(ages)
+        self._bits = np.zeros((max(self.size, 16), self._n_words), dtype=np.uint64)
+        self._bits[:self.size] = bits
+        self._ages = np.zeros(len(self._bits), dtype=np.float32)
+        self._ages[:self.size] = ages
+        # Bumped on every change, so derived structures can tell they are stale
+        self.version = 0
+
+    @property
+    def matrix(self):
+        """CSR copy of the live rows, unpacked scan_rows rows at a time."""
+        blocks = [slice(start, min(start + self.scan_rows, self.size))
+                  for start in range(0, max(self.size, 1), self.scan_rows)]
+        return sp.vstack([self._unpack(self._bits[rows], self._ages[rows]) for rows in blocks], format="csr")
+
+    @property
+    def sq_norms(self):
+        age = self._age_values(self._ages[:self.size])
+        return _popcount(self._bits[:self.size]) @ self._word_weights + age * age
+
+    @property
+    def nbytes(self):
+        """Bytes allocated for the packed rows, spare capacity included."""
+        return self._bits.nbytes + self._ages.nbytes
+
+    def take(self, positions):
+        """CSR copy of the rows at positions."""
+        return self._unpack(self._bits[positions], self._ages[positions])
+
+    def append(self, row):
+        """Append a 1 x n_columns CSR row and return its position."""
+        return self.extend(row)
+
+    def extend(self, rows):
+        """Append a block of CSR rows; return the position of the first."""
+        bits, ages = self._pack(rows)
+        start, stop = self.size, self.size + len(ages)
+        if stop > len(self._bits):
+            capacity = max(stop, 2 * len(self._bits))
+            self._bits = np.resize(self._bits, (capacity, self._n_words))
+            self._ages = np.resize(self._ages, capacity)
+        self._bits[start:stop] = bits
+        self._ages[start:stop] = ages
+        self.size = stop
+        self.version += 1
+        return start
+
+    def update(self, pos, row):
+        bits, ages = self._pack(row)
+        self._bits[pos] = bits[0]
+        self._ages[pos] = ages[0]
+        self.version += 1
+
+    def remove(self, pos):
+        """Remove a row by moving the last row into its slot; return the moved row's old position."""
+        last = self.size - 1
+        moved = None
+        if pos != last:
+            self._bits[pos] = self._bits[last]
+            self._ages[pos] = self._ages[last]
+            moved = last
+        self.size = last
+        self.version += 1
+        return moved
+
+    def widen(self, n_columns, columns=None):
+        """Adopt a layout grown by appended columns; stored rows are unchanged."""
+        if columns is None:
+            raise ValueError("The packed index backend needs the (block, token) column layout")
+        old_words = dict(self._block_words)
+        self._layout(columns)
+        if self._block_words != old_words:
+            bits = np.zeros((len(self._bits), self._n_words), dtype=np.uint64)
+            for block, (start, stop) in old_words.items():
+                new_start = self._block_words[block][0]
+                bits[:, new_start:new_start + stop - start] = self._bits[:, start:stop]
+            self._bits = bits
+        self.version += 1
+
+    def distances_to(self, query, positions):
+        """Euclidean distances from one dense query vector to the rows at positions."""
+        bits, ages = self._pack(sp.csr_matrix(query.reshape(1, -1)))
+        return np.sqrt(self._sq_distances(bits[0], ages[0], np.asarray(positions)))
+
+    def kneighbors(self, X, n_neighbors=None):
+        """Same contract as NearestNeighbors.kneighbors: (distances, indices) sorted by distance."""
+        k = min(n_neighbors or self.n_neighbors, self.size)
+        bits, ages = self._pack(X if sp.issparse(X) else np.atleast_2d(X))
+        distances = np.empty((len(ages), k))
+        indices = np.empty((len(ages), k), dtype=np.int64)
+        for i in range(len(ages)):
+            sq = self._sq_distances(bits[i], ages[i])
+            indices[i] = nearest(sq, k)
+            distances[i] = np.sqrt(sq[indices[i]])
+        return distances, indices
+
+    def _sq_distances(self, bits, age, positions=None):
+        """Squared distances from one packed query to all rows, or to the rows at positions."""
+        n = self.size if positions is None else len(positions)
+        sq = np.empty(n)
+        age_weight = (self._weights[self._age_column] / 100.0) ** 2
+        for start in range(0, n, self.scan_rows):
+            stop = min(start + self.scan_rows, n)
+            rows = slice(start, stop) if positions is None else positions[start:stop]
+            # float32 differences of whole ages are exact; square in float64
+            age_diff = (self._ages[rows] - age).astype(np.float64)
+            sq[start:stop] = _popcount(self._bits[rows] ^ bits) @ self._word_weights
+            sq[start:stop] += age_weight * age_diff * age_diff
+        return sq
+
+    def _age_values(self, ages):
+        """Age column values of float32 ages, as the encoder computes them."""
+        return ages.astype(np.float64) / 100.0 * self._weights[self._age_column]
+
+    def _unpack(self, bits, ages):
+        """Weighted CSR rows of packed (bits, ages)."""
+        n_rows = len(ages)
+        rows, set_bits = np.nonzero(np.unpackbits(
+            bits.astype("<u8", copy=False).view(np.uint8), axis=1, bitorder="little"))
+        rows = np.concatenate([rows, np.arange(n_rows)])
+        cols = np.concatenate([self._bit_column[set_bits], np.full(n_rows, self._age_column)])
+        data = self._weights[cols]
+        data[len(data) - n_rows:] = self._age_values(ages)
+        matrix = sp.csr_matrix((data, (rows, cols)), shape=(n_rows, self.n_columns))
+        matrix.sort_indices()
+        return matrix
+
+    def _pack(self, rows):
+        """(bits, ages) of weighted CSR rows in this layout."""
+        rows = sp.csr_matrix(rows)
+        n_rows = rows.shape[0]
+        row_of = np.repeat(np.arange(n_rows), np.diff(rows.indptr))
+        is_age = rows.indices == self._age_column
+        ages = np.zeros(n_rows, dtype=np.float32)
+        ages[row_of[is_age]] = rows.data[is_age] / self._weights[self._age_column] * 100.0
+        is_token = ~is_age & (rows.data != 0)
+        cols = rows.indices[is_token]
+        bits = np.zeros((n_rows, self._n_words), dtype=np.uint64)
+        np.bitwise_or.at(bits, (row_of[is_token], self._column_word[cols]), self._column_mask[cols])
+        return bits, ages
+
+    def _layout(self, columns):
+        """Give every token column a (word, bit); each block owns a run of words.
+
+        Columns are only ever appended, so a token keeps its rank within its
+        block and a block that grows keeps the bits already set.
+        """
+        blocks = [block for block, _ in columns]
+        self._age_column = blocks.index("age")
+        ranks = np.zeros(len(columns), dtype=np.int64)
+        counts = {}
+        for i, block in enumerate(blocks):
+            if block != "age":
+                ranks[i] = counts.get(block, 0)
+                counts[block] = int(ranks[i]) + 1
+        block_words, n_words = {}, 0
+        for block in sorted(counts, key=BLOCKS.index):
+            start, stop = self._block_words.get(block, (0, 0))
+            width = stop - start
+            needed = -(-counts[block] // 64)
+            if needed > width:
+                # A block that outgrows its words gets spare ones, so repacks stay rare
+                width = 2 * needed if width else needed
+            block_words[block] = (n_words, n_words + width)
+            n_words += width
+        is_token = np.array([block != "age" for block in blocks])
+        offsets = np.array([block_words[block][0] if block != "age" else 0 for block in blocks], dtype=np.int64)
+        self.columns = list(columns)
+        self.n_columns = len(columns)
+        self._block_words, self._n_words = block_words, n_words
+        self._weights = np.array([BLOCK_WEIGHTS[block] for block in blocks])
+        self._word_weights = np.zeros(n_words)
+        for block, (start, stop) in block_words.items():
+            self._word_weights[start:stop] = BLOCK_WEIGHTS[block] ** 2
+        self._column_word = np.where(is_token, offsets + ranks // 64, -1)
+        self._column_mask = np.left_shift(np.uint64(1), (ranks % 64).astype(np.uint64))
+        self._bit_column = np.full(n_words * 64, -1, dtype=np.int64)
+        self._bit_column[(self._column_word * 64 + ranks % 64)[is_token]] = np.flatnonzero(is_token)
+
+
+INDEX_BACKENDS = {
+    "brute": BruteForceIndex,
+    "ball_tree": BallTreeIndex,
+    "lsh": LSHIndex,
+    "packed": PackedIndex,
+}
+
+
+@timed("index_build")
+def make_index(matrix, backend="brute", n_neighbors=5, columns=None, **params):
+    """Build the named index backend over a mentor matrix; params go to its constructor.
+
+    columns, the matrix's (block, token) layout, is passed on to backends that need it.
+    """
+    if backend not in INDEX_BACKENDS:
+        raise ValueError(f"Unknown index backend {backend!r}; choose from {sorted(INDEX_BACKENDS)}")
+    if getattr(INDEX_BACKENDS[backend], "needs_columns", False):
+        params["columns"] = columns
+    return INDEX_BACKENDS[backend](matrix, n_neighbors, **params)
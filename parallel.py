@@ -0,0 +1,187 @@
+"""
+Multi-process batch matching over shared memory.
+
+The mentor rows (CSR arrays plus squared norms) and the mentee rows are
+copied once into multiprocessing.shared_memory blocks. Pool workers attach
+to them in their initializer, so no matrix is pickled per worker or per
+task, and tasks are just (start, stop) mentee row ranges. Each worker
+answers its ranges with the exact brute-force kernel
+(neighbor_index.brute_kneighbors) and the parent writes every range's top-k
+back at its row offset. A mentee's neighbors only depend on its own row, so
+the merged result is identical to the serial one whatever the worker count,
+shard size or completion order.
+
+parallel_encode_profiles shards the list parsing and one-hot encoding the
+same way: workers explode and intern the tokens of a contiguous row range
+and send back integer codes plus that range's distinct tokens. The parent
+fits the sorted layout over the distinct tokens only and maps the codes to
+columns, so the matrices equal encode_profiles' output.
+
+Worker count defaults to MATCHER_WORKERS, else the number of CPUs.
+"""
+import concurrent.futures
+import os
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from instrumentation import timed
+from neighbor_index import brute_kneighbors
+from preprocessing import BLOCKS, CATEGORICAL_BLOCKS, column_weights, frame_tokens, weighted_csr
+
+N_WORKERS = int(os.environ.get("MATCHER_WORKERS", "0")) or os.cpu_count() or 1
+
+# Set in each worker by _attach: {name: array} views on the shared blocks
+_shared = {}
+_segments = []
+
+
+class SharedArrays:
+    """Copies of named arrays in shared memory blocks, reopened in workers from `spec`."""
+
+    def __init__(self, arrays):
+        self.spec = {}
+        self._segments = []
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            segment = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            self._segments.append(segment)
+            np.ndarray(array.shape, array.dtype, buffer=segment.buf)[...] = array
+            self.spec[name] = (segment.name, array.shape, array.dtype.str)
+
+    def close(self):
+        for segment in self._segments:
+            segment.close()
+            segment.unlink()
+        self._segments = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+def _attach(spec):
+    """Pool initializer: map the shared arrays into this worker."""
+    for name, (segment_name, shape, dtype) in spec.items():
+        # Pool workers share the parent's resource tracker, which unlinks the
+        # blocks only if the parent fails to
+        segment = shared_memory.SharedMemory(name=segment_name)
+        _segments.append(segment)
+        _shared[name] = np.ndarray(shape, np.dtype(dtype), buffer=segment.buf)
+
+
+def _csr_arrays(prefix, matrix):
+    """A CSR matrix's arrays with one index dtype, so scipy can wrap them without a copy."""
+    index_dtype = np.int32 if max(matrix.nnz, matrix.shape[1]) < 2**31 else np.int64
+    return {
+        f"{prefix}_data": matrix.data,
+        f"{prefix}_indices": matrix.indices.astype(index_dtype, copy=False),
+        f"{prefix}_indptr": matrix.indptr.astype(index_dtype, copy=False),
+    }
+
+
+def _shared_csr(prefix, shape):
+    return sp.csr_matrix(
+        (_shared[f"{prefix}_data"], _shared[f"{prefix}_indices"], _shared[f"{prefix}_indptr"]),
+        shape=shape, copy=False)
+
+
+def _top_k(start, stop, k, block_rows, mentee_shape, mentor_shape):
+    """Worker task: the top-k mentors of mentee rows [start, stop), block_rows at a time."""
+    mentees = _shared_csr("mentee", mentee_shape)
+    mentors = _shared_csr("mentor", mentor_shape)
+    distances = np.empty((stop - start, k))
+    indices = np.empty((stop - start, k), dtype=np.int64)
+    for block_start in range(start, stop, block_rows):
+        block_stop = min(block_start + block_rows, stop)
+        distances[block_start - start:block_stop - start], indices[block_start - start:block_stop - start] = (
+            brute_kneighbors(mentees[block_start:block_stop], mentors, _shared["mentor_sq_norms"], k))
+    return start, (distances, indices)
+
+
+def parallel_kneighbors(mentee_matrix, mentor_rows, k, n_workers=N_WORKERS, block_rows=1024, shards_per_worker=4):
+    """Exact top-k (distances, indices) of every mentee row, sharded over a process pool.
+
+    mentor_rows is a FeatureRows store (any index backend). The mentees are
+    split into about shards_per_worker contiguous shards per worker, and each
+    shard is scored block_rows rows at a time.
+    """
+    mentee_matrix = sp.csr_matrix(mentee_matrix)
+    n_mentees = mentee_matrix.shape[0]
+    k = min(k, mentor_rows.size)
+    distances = np.empty((n_mentees, k))
+    indices = np.empty((n_mentees, k), dtype=np.int64)
+    if not n_mentees or not k:
+        return distances, indices
+    mentor_matrix = mentor_rows.matrix
+    arrays = {**_csr_arrays("mentee", mentee_matrix), **_csr_arrays("mentor", mentor_matrix),
+              "mentor_sq_norms": mentor_rows.sq_norms}
+    with SharedArrays(arrays) as shared, concurrent.futures.ProcessPoolExecutor(
+            n_workers, initializer=_attach, initargs=(shared.spec,)) as pool:
+        shard_rows = -(-n_mentees // (n_workers * shards_per_worker))
+        tasks = [pool.submit(_top_k, start, min(start + shard_rows, n_mentees), k, block_rows,
+                             mentee_matrix.shape, mentor_matrix.shape)
+                 for start in range(0, n_mentees, shard_rows)]
+        for task in concurrent.futures.as_completed(tasks):
+            start, (block_distances, block_indices) = task.result()
+            distances[start:start + len(block_distances)] = block_distances
+            indices[start:start + len(block_indices)] = block_indices
+    return distances, indices
+
+
+def _shard_tokens(start, frame, columns, language_sep):
+    """Worker task: {block: (rows, codes, distinct tokens)} of a frame shard starting at row start."""
+    shard = {}
+    for block, tokens in frame_tokens(frame, columns, language_sep).items():
+        codes, uniques = pd.factorize(tokens)
+        shard[block] = (tokens.index.to_numpy() + start, codes, uniques.tolist())
+    return shard
+
+
+@timed("encode")
+def parallel_encode_profiles(mentee_data, mentor_data, mentee_columns, mentor_columns,
+                             mentee_language_sep=",", mentor_language_sep=",",
+                             n_workers=N_WORKERS, shards_per_worker=4):
+    """encode_profiles with the token parsing and interning sharded over a process pool.
+
+    Each table is split into about shards_per_worker contiguous row shards
+    per worker; only the categorical columns are sent to the workers.
+    Returns (columns, mentee CSR, mentor CSR), identical to encode_profiles.
+    """
+    tables = ((mentee_data, mentee_columns, mentee_language_sep),
+              (mentor_data, mentor_columns, mentor_language_sep))
+    with concurrent.futures.ProcessPoolExecutor(n_workers) as pool:
+        tasks = []
+        for frame, columns, language_sep in tables:
+            frame = frame[[columns[block] for block in CATEGORICAL_BLOCKS]]
+            shard_rows = max(-(-len(frame) // (n_workers * shards_per_worker)), 1)
+            tasks.append([pool.submit(_shard_tokens, start, frame.iloc[start:start + shard_rows],
+                                      columns, language_sep)
+                          for start in range(0, len(frame), shard_rows)])
+        # Kept in submission (row) order, so the layout and matrices are deterministic
+        shards = [[task.result() for task in table_tasks] for table_tasks in tasks]
+
+    columns = []
+    for block in BLOCKS:
+        if block == "age":
+            columns.append(("age", "age"))
+            continue
+        vocabulary = {token for table in shards for shard in table for token in shard[block][2]}
+        columns.extend((block, token) for token in sorted(vocabulary))
+    column_index = {column: i for i, column in enumerate(columns)}
+    weights = column_weights(columns)
+    matrices = []
+    for (frame, table_columns, _), table in zip(tables, shards):
+        rows, cols = [], []
+        for shard in table:
+            for block, (block_rows, codes, uniques) in shard.items():
+                lookup = np.array([column_index[(block, token)] for token in uniques], dtype=np.int64)
+                rows.append(block_rows)
+                cols.append(lookup[codes] if len(codes) else np.zeros(0, dtype=np.int64))
+        matrices.append(weighted_csr(rows, cols, frame[table_columns["age"]], column_index, weights))
+    return (columns, *matrices)
@@ -0,0 +1,295 @@
+"""
+Vectorized profile preprocessing and feature encoding.
+
+List columns (skills, interests, languages) arrive either as real lists (from
+the database or the interactive app) or as stringified Python lists in the
+CSVs, e.g. ``["['python'", "'sql']"]``. Splitting those on ', ' leaves stray
+brackets and quotes on the first and last tokens, which bloats the vocabulary
+and hurts match quality. Here each column is normalized in a single vectorized
+pass: all string cells are split at once (pyarrow.compute's split_pattern
+and list_flatten when pyarrow is installed, else one join and one split),
+raw tokens are interned (dictionary-encoded) so brackets and quotes are
+stripped and tokens trimmed and lowercased once per distinct token, and the
+result is one exploded token Series per block. Tokens are then mapped to
+integer column ids, which is all the CSR encoder needs; per-row Python lists
+(token_lists) are only built for frames that keep list columns.
+
+Feature layout: blocks in BLOCKS order, each block's vocabulary sorted, one
+age column; indicators carry their block weight (a column scaling of the 0/1
+matrix) and the age column holds age / 100 * its weight.
+"""
+import importlib.util
+import re
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from instrumentation import stage, timed
+
+# pyarrow is optional; when installed it is used as the CSV parser and to
+# split string list cells. It is imported on first use.
+HAS_ARROW = importlib.util.find_spec("pyarrow") is not None
+CSV_ENGINE = "pyarrow" if HAS_ARROW else "c"
+
+# Feature blocks in column order, with the weights used by create_feature_vectors.
+BLOCKS = ("skills", "interests", "field", "age", "languages", "country")
+BLOCK_WEIGHTS = {
+    "skills": 0.20,
+    "interests": 0.075,
+    "field": 0.30,
+    "age": 0.10,
+    "languages": 0.175,
+    "country": 0.15,
+}
+LIST_BLOCKS = ("skills", "interests", "languages")
+LABEL_BLOCKS = ("field", "country")
+CATEGORICAL_BLOCKS = LIST_BLOCKS + LABEL_BLOCKS
+LOWERCASE_LABEL_BLOCKS = ("country",)
+
+# Block -> column name for the frames returned by load_and_preprocess_data.
+CSV_MENTEE_COLUMNS = {
+    "skills": "STEM Skills",
+    "interests": "Interests",
+    "field": "Desired Field",
+    "age": "Age",
+    "languages": "languages",
+    "country": "country_clean",
+}
+CSV_MENTOR_COLUMNS = {
+    "skills": "stem_skills",
+    "interests": "interests",
+    "field": "field",
+    "age": "age",
+    "languages": "languages",
+    "country": "country_clean",
+}
+
+# Raw CSV columns per block; languages are "/"- or ","-separated for mentees
+# and whitespace-separated for mentors.
+RAW_CSV_MENTEE_COLUMNS = {
+    "skills": "STEM Skills",
+    "interests": "Interests",
+    "field": "Desired Field",
+    "age": "Age",
+    "languages": "Speaking Language",
+    "country": "Country",
+}
+RAW_CSV_MENTOR_COLUMNS = {
+    "skills": "stem_skills",
+    "interests": "interests",
+    "field": "field",
+    "age": "age",
+    "languages": "speaking_language",
+    "country": "country",
+}
+MENTEE_LANGUAGE_SEP = "/,"
+MENTOR_LANGUAGE_SEP = " \t"
+
+# Characters left over from stringified Python lists.
+LIST_DEBRIS_PATTERN = r"[\[\]\"']"
+# Joins string cells for the single-pass split; never appears in profile text.
+RECORD_SEPARATOR = "\x1e"
+
+
+def _split_string_cells(cells, sep):
+    """Split string cells on any character of `sep` in one C-level pass.
+
+    Returns (cell position of each token, token codes, distinct raw tokens);
+    missing cells produce no tokens.
+    """
+    if HAS_ARROW:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        array = pa.array(cells, type=pa.string(), from_pandas=True)
+        if isinstance(array, pa.ChunkedArray):
+            array = array.combine_chunks()
+        if len(sep) > 1:
+            array = pc.replace_substring_regex(array, "[" + re.escape(sep[1:]) + "]", sep[0])
+        lists = pc.split_pattern(array, sep[0])
+        lengths = pc.fill_null(pc.list_value_length(lists), 0).to_numpy()
+        interned = pc.dictionary_encode(pc.list_flatten(lists))
+        return (np.repeat(np.arange(len(cells)), lengths),
+                interned.indices.to_numpy(zero_copy_only=False).astype(np.int64),
+                np.array(interned.dictionary.to_pylist(), dtype=object))
+    present = np.flatnonzero(cells.notna().to_numpy())
+    if not len(present):
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=object)
+    # Every separator becomes sep[0]; cells stay apart on the record separator
+    joined = RECORD_SEPARATOR.join(cells.iloc[present].tolist()).translate({ord(c): sep[0] for c in sep[1:]})
+    raw = np.frombuffer(joined.encode("utf-8"), dtype=np.uint8)
+    is_boundary = raw == ord(RECORD_SEPARATOR)
+    cell_of_token = np.concatenate([[0], np.cumsum(is_boundary[is_boundary | (raw == ord(sep[0]))])])
+    codes, uniques = pd.factorize(np.array(joined.replace(RECORD_SEPARATOR, sep[0]).split(sep[0]), dtype=object))
+    return present[cell_of_token], codes, np.asarray(uniques, dtype=object)
+
+
+def explode_tokens(values, block, sep=","):
+    """Normalized tokens of one block as a categorical Series indexed by row position, sorted by row.
+
+    List cells are used as-is; string cells in list blocks are split on any
+    character of `sep`. Raw tokens are interned first so the string
+    normalization runs once per distinct token rather than once per
+    occurrence, and the result keeps those codes (one category per distinct
+    token) instead of materializing a string per occurrence. Missing cells
+    and empty tokens produce no rows.
+    """
+    values = values if isinstance(values, pd.Series) else pd.Series(list(values), dtype=object)
+    values = values.reset_index(drop=True)
+    if block in LIST_BLOCKS and pd.api.types.infer_dtype(values, skipna=True) in ("string", "empty"):
+        positions, codes, uniques = _split_string_cells(values, sep)
+    elif block in LIST_BLOCKS:
+        # Mixed list and string cells, e.g. a CSV frame with rows added by the app
+        is_str = np.fromiter((isinstance(v, str) for v in values), dtype=bool, count=len(values))
+        str_rows = np.flatnonzero(is_str)
+        str_positions, str_codes, str_uniques = _split_string_cells(values.iloc[str_rows], sep)
+        listed = values[~is_str].explode()
+        list_codes, list_uniques = pd.factorize(listed.to_numpy(dtype=object))
+        positions = np.concatenate([str_rows[str_positions], listed.index.to_numpy()])
+        codes = np.concatenate([str_codes, np.where(list_codes >= 0, list_codes + len(str_uniques), -1)])
+        uniques = np.concatenate([str_uniques, np.asarray(list_uniques, dtype=object)])
+        order = np.argsort(positions, kind="stable")
+        positions, codes = positions[order], codes[order]
+    else:
+        positions = np.arange(len(values))
+        codes, uniques = pd.factorize(values.to_numpy(dtype=object))
+    normalized = pd.Series(uniques, dtype=object).astype(str).str.strip()
+    if block in LIST_BLOCKS:
+        normalized = normalized.str.replace(LIST_DEBRIS_PATTERN, "", regex=True).str.strip().str.lower()
+    elif block in LOWERCASE_LABEL_BLOCKS:
+        normalized = normalized.str.lower()
+    # Raw tokens that normalize alike share one category; empty ones are dropped
+    normalized = normalized.to_numpy(dtype=object)
+    token_codes, tokens = pd.factorize(np.where(normalized == "", None, normalized))
+    codes = np.where(codes >= 0, token_codes[np.maximum(codes, 0)], -1) if len(token_codes) else codes
+    keep = codes >= 0
+    return pd.Series(pd.Categorical.from_codes(codes[keep], categories=pd.Index(tokens, dtype=object)),
+                     index=positions[keep])
+
+
+def frame_tokens(frame, columns, language_sep=","):
+    """{block: exploded tokens} for every categorical block of a frame."""
+    return {block: explode_tokens(frame[columns[block]], block,
+                                  sep=language_sep if block == "languages" else ",")
+            for block in CATEGORICAL_BLOCKS}
+
+
+def token_lists(tokens, n_rows):
+    """Per-row Python lists from exploded tokens (sorted by row), for frames that keep list columns."""
+    values = tokens.tolist()
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(tokens.index.to_numpy(), minlength=n_rows))]).tolist()
+    return [values[start:stop] for start, stop in zip(offsets[:-1], offsets[1:])]
+
+
+def sorted_columns(*token_sets):
+    """Sorted per-block (block, token) column layout over one or more frame_tokens results."""
+    columns = []
+    for block in BLOCKS:
+        if block == "age":
+            columns.append(("age", "age"))
+            continue
+        vocabulary = set()
+        for tokens in token_sets:
+            vocabulary.update(pd.unique(tokens[block]))
+        columns.extend((block, token) for token in sorted(vocabulary))
+    return columns
+
+
+def column_weights(columns):
+    """Per-column weight vector of a layout."""
+    return np.array([BLOCK_WEIGHTS[block] for block, _ in columns])
+
+
+def code_tokens(tokens, block, column_index):
+    """Intern a block's tokens and map them to column ids; returns (rows, cols).
+
+    Each distinct token is looked up once; tokens missing from column_index are dropped.
+    """
+    tokens = tokens.astype("category")
+    codes = tokens.cat.codes.to_numpy()
+    lookup = np.array([column_index.get((block, token), -1) for token in tokens.cat.categories], dtype=np.int64)
+    cols = lookup[codes] if len(codes) else np.zeros(0, dtype=np.int64)
+    known = cols >= 0
+    return tokens.index.to_numpy()[known], cols[known]
+
+
+def encode_tokens(tokens, ages, column_index, weights):
+    """Encode {block: exploded tokens} and ages into a weighted CSR matrix (see weighted_csr)."""
+    rows, cols = [], []
+    for block, block_tokens in tokens.items():
+        block_rows, block_cols = code_tokens(block_tokens, block, column_index)
+        rows.append(block_rows)
+        cols.append(block_cols)
+    return weighted_csr(rows, cols, ages, column_index, weights)
+
+
+def weighted_csr(rows, cols, ages, column_index, weights):
+    """Weighted CSR matrix from lists of (row, column id) token arrays plus the ages.
+
+    Repeated tokens within a row count once.
+    """
+    ages = np.asarray(ages, dtype=float)
+    n_rows = len(ages)
+    age_col = column_index[("age", "age")]
+    # int32 ids when they fit, so scipy takes them without another cast
+    index_dtype = np.int32 if n_rows + sum(map(len, rows)) < 2**31 and len(column_index) < 2**31 else np.int64
+    rows = np.concatenate([np.arange(n_rows), *rows], dtype=index_dtype, casting="same_kind")
+    cols = np.concatenate([np.full(n_rows, age_col), *cols], dtype=index_dtype, casting="same_kind")
+    data = np.ones(len(rows))
+    data[:n_rows] = ages
+    matrix = sp.csr_matrix((data, (rows, cols)), shape=(n_rows, len(column_index)))
+    matrix.sum_duplicates()
+    is_age = matrix.indices == age_col
+    matrix.data = np.where(is_age, matrix.data / 100.0, 1.0) * weights[matrix.indices]
+    return matrix
+
+
+@timed("encode")
+def encode_profiles(mentee_data, mentor_data, mentee_columns, mentor_columns,
+                    mentee_language_sep=",", mentor_language_sep=","):
+    """Fit the shared sorted layout over both tables and encode them.
+
+    Returns (columns, mentee CSR, mentor CSR).
+    """
+    mentee_tokens = frame_tokens(mentee_data, mentee_columns, mentee_language_sep)
+    mentor_tokens = frame_tokens(mentor_data, mentor_columns, mentor_language_sep)
+    columns = sorted_columns(mentee_tokens, mentor_tokens)
+    column_index = {column: i for i, column in enumerate(columns)}
+    weights = column_weights(columns)
+    return (columns,
+            encode_tokens(mentee_tokens, mentee_data[mentee_columns["age"]], column_index, weights),
+            encode_tokens(mentor_tokens, mentor_data[mentor_columns["age"]], column_index, weights))
+
+
+@timed("preprocess")
+def normalize_csv_profiles(mentee_data, mentor_data):
+    """Vectorized in-place normalization of the raw CSV frames.
+
+    Parses the list columns into clean token lists and derives the
+    `languages` and `country_clean` columns the encoder expects.
+    """
+    for frame, columns, language_column, language_sep in (
+            (mentee_data, CSV_MENTEE_COLUMNS, "Speaking Language", MENTEE_LANGUAGE_SEP),
+            (mentor_data, CSV_MENTOR_COLUMNS, "speaking_language", MENTOR_LANGUAGE_SEP)):
+        n_rows = len(frame)
+        for block in ("skills", "interests"):
+            frame[columns[block]] = token_lists(explode_tokens(frame[columns[block]], block), n_rows)
+        frame[language_column] = frame[language_column].fillna("")
+        frame["languages"] = token_lists(
+            explode_tokens(frame[language_column], "languages", sep=language_sep), n_rows)
+    mentee_data["country_clean"] = mentee_data["Country"].str.lower().str.strip()
+    mentor_data["country_clean"] = mentor_data["country"].str.lower().str.strip()
+    return mentee_data, mentor_data
+
+
+def encode_csv_files(mentee_file, mentor_file):
+    """Fast path from the raw CSVs straight to (columns, mentee CSR, mentor CSR).
+
+    Only the encoder columns are parsed and no per-row Python lists are built.
+    """
+    with stage("load"):
+        mentee_data = pd.read_csv(mentee_file, usecols=list(RAW_CSV_MENTEE_COLUMNS.values()), engine=CSV_ENGINE)
+        mentor_data = pd.read_csv(mentor_file, usecols=list(RAW_CSV_MENTOR_COLUMNS.values()), engine=CSV_ENGINE)
+    return encode_profiles(mentee_data, mentor_data, RAW_CSV_MENTEE_COLUMNS, RAW_CSV_MENTOR_COLUMNS,
+                           MENTEE_LANGUAGE_SEP, MENTOR_LANGUAGE_SEP)
@@ -0,0 +1,183 @@
+"""
+Columnar on-disk profile store.
+
+The interactive app used to rewrite the whole CSV on every signup and reparse
+the stringified list columns on every start. A ProfileStore keeps a table as
+
+  - a snapshot: an Arrow IPC file with list-typed skill, interest and
+    language columns, memory-mapped on load (a pickle when pyarrow is not
+    installed), and
+  - an append-only delta log: one JSON line per inserted row, so an insert
+    writes a single line instead of the whole table.
+
+Once the log holds `compact_every` rows it is folded into a new snapshot.
+Both files carry a generation number (``snapshot-<n>``, ``delta-<n>.jsonl``):
+compaction writes generation n+1 before removing generation n, so a crash at
+any point leaves a consistent, duplicate-free store.
+"""
+import glob
+import importlib.util
+import json
+import logging
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import stage, timed
+
+# pyarrow is optional; without it snapshots are pickled DataFrames.
+HAS_ARROW = importlib.util.find_spec("pyarrow") is not None
+SNAPSHOT_SUFFIX = ".arrow" if HAS_ARROW else ".pkl"
+DEFAULT_COMPACT_EVERY = 1000
+
+logger = logging.getLogger(__name__)
+
+
+def _json_default(value):
+    """numpy scalars and arrays in records are written as plain JSON values."""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Unserializable profile value: {value!r}")
+
+
+def _write_snapshot(frame, path):
+    """Write frame to path via a temporary file and an atomic rename."""
+    tmp_path = path + ".tmp"
+    if HAS_ARROW:
+        import pyarrow as pa
+
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        frame.to_pickle(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _list_column(column):
+    """Python lists from an Arrow list column, sharing one str object per distinct token."""
+    column = column.combine_chunks()
+    values = column.flatten().dictionary_encode()
+    if column.null_count or values.indices.null_count:
+        return column.to_pylist()
+    tokens = np.array(values.dictionary.to_pylist(), dtype=object)[values.indices.to_numpy()].tolist()
+    offsets = column.offsets.to_numpy()
+    offsets = (offsets - offsets[0]).tolist()
+    return [tokens[start:stop] for start, stop in zip(offsets[:-1], offsets[1:])]
+
+
+def _read_snapshot(path):
+    if path.endswith(".arrow"):
+        import pyarrow as pa
+
+        with pa.memory_map(path, "r") as source:
+            table = pa.ipc.open_file(source).read_all()
+            frame = table.to_pandas()
+            # to_pandas turns list columns into numpy arrays; the app expects lists
+            for field in table.schema:
+                if pa.types.is_list(field.type):
+                    frame[field.name] = _list_column(table.column(field.name))
+        return frame
+    return pd.read_pickle(path)
+
+
+class ProfileStore:
+    """One profile table on disk: memory-mapped snapshot plus append-only delta log."""
+
+    def __init__(self, directory, compact_every=DEFAULT_COMPACT_EVERY):
+        self.directory = directory
+        self.compact_every = compact_every
+        self.generation = self._latest_generation()
+        if self.exists:
+            self._repair_delta()
+        self.pending = self._count_pending()
+
+    @property
+    def exists(self):
+        return self.generation is not None
+
+    def snapshot_path(self, generation):
+        return os.path.join(self.directory, f"snapshot-{generation}{SNAPSHOT_SUFFIX}")
+
+    def delta_path(self, generation):
+        return os.path.join(self.directory, f"delta-{generation}.jsonl")
+
+    @timed("load")
+    def load(self):
+        """The full table: snapshot rows followed by logged inserts, in insertion order."""
+        if not self.exists:
+            raise FileNotFoundError(f"No profile snapshot in {self.directory}")
+        frame = _read_snapshot(self._snapshot_file(self.generation))
+        delta = self._read_delta()
+        if delta:
+            frame = pd.concat([frame, pd.DataFrame(delta)], ignore_index=True)
+        return frame
+
+    @timed("persist")
+    def write(self, frame):
+        """Replace the store's contents with frame as a fresh snapshot."""
+        os.makedirs(self.directory, exist_ok=True)
+        previous = self.generation
+        generation = 0 if previous is None else previous + 1
+        _write_snapshot(frame, self.snapshot_path(generation))
+        self.generation, self.pending = generation, 0
+        if previous is not None:
+            for path in (self._snapshot_file(previous), self.delta_path(previous)):
+                if path and os.path.exists(path):
+                    os.remove(path)
+
+    def append(self, frame):
+        """Log the rows of frame; compacts once compact_every rows are pending."""
+        if not self.exists:
+            self.write(frame)
+            return
+        records = frame.to_dict(orient="records")
+        with stage("persist"), open(self.delta_path(self.generation), "a", encoding="utf-8") as log:
+            for record in records:
+                log.write(json.dumps(record, default=_json_default) + "\n")
+            log.flush()
+            os.fsync(log.fileno())
+        self.pending += len(records)
+        if self.pending >= self.compact_every:
+            self.compact()
+
+    def compact(self):
+        """Fold the delta log into a new snapshot."""
+        if self.exists and self.pending:
+            logger.info("Compacting %d logged rows into %s", self.pending, self.directory)
+            self.write(self.load())
+
+    def _snapshot_file(self, generation):
+        matches = glob.glob(os.path.join(self.directory, f"snapshot-{generation}.*"))
+        matches = [path for path in matches if not path.endswith(".tmp")]
+        return matches[0] if matches else None
+
+    def _latest_generation(self):
+        generations = [int(m.group(1)) for path in glob.glob(os.path.join(self.directory, "snapshot-*"))
+                       if (m := re.fullmatch(r"snapshot-(\d+)\.(arrow|pkl)", os.path.basename(path)))]
+        return max(generations) if generations else None
+
+    def _read_delta(self):
+        path = self.delta_path(self.generation)
+        if not os.path.exists(path):
+            return []
+        with open(path, encoding="utf-8") as log:
+            return [json.loads(line) for line in log]
+
+    def _repair_delta(self):
+        """Drop a torn final line left by a crash mid-append."""
+        path = self.delta_path(self.generation)
+        if not os.path.exists(path):
+            return
+        with open(path, "rb+") as log:
+            data = log.read()
+            end = data.rfind(b"\n") + 1
+            if end != len(data):
+                log.truncate(end)
+
+    def _count_pending(self):
+        return len(self._read_delta()) if self.exists else 0
@@ -0,0 +1,57 @@
+"""
+Per-block score breakdown and query-time block weights.
+
+An encoded row is one weighted column group per block (preprocessing.BLOCKS),
+so a squared distance is the sum of per-block squared distances. A match's
+breakdown splits its shortfall from a perfect score (100 - score) between
+the blocks in proportion to those terms: the points each block cost the
+match, so score + sum(breakdown) == 100. Pairs are taken in bulk, as aligned
+rows of two CSR matrices, with one sparse product per batch.
+
+Query-time weights re-weight a block from its encoded weight w to w'. That
+scales the block's columns by w' / w in the queries and the stored rows
+alike, so nothing is re-encoded: the stored rows are scaled once per weight
+setting, and a block's squared distances scale by (w' / w)^2.
+"""
+import numpy as np
+import scipy.sparse as sp
+
+from preprocessing import BLOCK_WEIGHTS, BLOCKS
+
+
+def block_indicator(columns):
+    """(n_columns, len(BLOCKS)) 0/1 CSR matrix assigning each column to its block."""
+    blocks = np.array([BLOCKS.index(block) for block, _ in columns], dtype=np.int64)
+    return sp.csr_matrix((np.ones(len(blocks)), (np.arange(len(blocks)), blocks)),
+                         shape=(len(blocks), len(BLOCKS)))
+
+
+def block_scales(weights):
+    """Per-block column scale w' / w for {block: weight} overrides, in BLOCKS order.
+
+    Raises ValueError on an unknown block or a negative weight.
+    """
+    unknown = set(weights) - set(BLOCKS)
+    if unknown:
+        raise ValueError(f"Unknown blocks {sorted(unknown)}; choose from {list(BLOCKS)}")
+    if any(weight < 0 for weight in weights.values()):
+        raise ValueError(f"Block weights must not be negative: {weights!r}")
+    return np.array([weights.get(block, BLOCK_WEIGHTS[block]) / BLOCK_WEIGHTS[block] for block in BLOCKS])
+
+
+def scale_columns(matrix, column_scales):
+    """A CSR matrix with every column multiplied by its scale."""
+    return sp.csr_matrix(matrix @ sp.diags(column_scales))
+
+
+def block_sq_distances(queries, rows, indicator):
+    """(n_pairs, len(BLOCKS)) squared distances per block between aligned rows of two CSR matrices."""
+    difference = sp.csr_matrix(queries) - sp.csr_matrix(rows)
+    return np.asarray((difference.multiply(difference) @ indicator).todense())
+
+
+def score_breakdown(block_sq, scores):
+    """Points each block cost a match: 100 - score, split by the blocks' squared distances."""
+    total = block_sq.sum(axis=1, keepdims=True)
+    share = np.divide(block_sq, total, out=np.zeros_like(block_sq), where=total > 0)
+    return (100.0 - np.asarray(scores))[:, None] * share
@@ -0,0 +1,149 @@
+"""
+In-memory stand-in for the Supabase client, for local load tests.
+
+StubClient implements the subset of the supabase-py query builder the
+service uses (select / eq / gt / in_ / order / limit / upsert / execute) over
+Python dicts, with an optional fixed latency per query to mimic a network
+round trip. seed_from_csv fills the mentees and mentors tables with
+database-shaped rows resampled from the bundled CSVs.
+"""
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from preprocessing import normalize_csv_profiles
+
+
+class StubResponse:
+    def __init__(self, data):
+        self.data = data
+
+
+class StubQuery:
+    """One query against a StubClient table; builder methods return self."""
+
+    def __init__(self, client, table):
+        self.client = client
+        self.table = table
+        self.columns = None
+        self.filters = []
+        self.order_by = None
+        self.row_limit = None
+        self.upsert_rows = None
+
+    def select(self, columns="*"):
+        self.columns = None if columns == "*" else columns.split(",")
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def gt(self, column, value):
+        self.filters.append(lambda row: row.get(column) is not None and row[column] > value)
+        return self
+
+    def in_(self, column, values):
+        values = set(values)
+        self.filters.append(lambda row: row.get(column) in values)
+        return self
+
+    def order(self, column, desc=False):
+        self.order_by = (column, desc)
+        return self
+
+    def limit(self, n):
+        self.row_limit = n
+        return self
+
+    def upsert(self, rows, on_conflict=None, ignore_duplicates=False):
+        self.upsert_rows = (rows, on_conflict.split(",") if on_conflict else None, ignore_duplicates)
+        return self
+
+    def execute(self):
+        if self.client.latency:
+            time.sleep(self.client.latency)
+        with self.client.lock:
+            if self.upsert_rows is not None:
+                return StubResponse(self.client._upsert(self.table, *self.upsert_rows))
+            rows = [row for row in self.client.tables.setdefault(self.table, []) if all(f(row) for f in self.filters)]
+        if self.order_by:
+            column, desc = self.order_by
+            rows.sort(key=lambda row: row[column], reverse=desc)
+        if self.row_limit is not None:
+            rows = rows[:self.row_limit]
+        if self.columns:
+            rows = [{column: row.get(column) for column in self.columns} for row in rows]
+        return StubResponse([dict(row) for row in rows])
+
+
+class StubClient:
+    """Thread-safe in-memory tables behind the supabase-py query-builder interface."""
+
+    def __init__(self, tables=None, latency=0.0):
+        self.tables = tables or {}
+        self.latency = latency
+        self.lock = threading.Lock()
+        self._keys = {}
+
+    def table(self, name):
+        return StubQuery(self, name)
+
+    def _upsert(self, table, rows, conflict_columns, ignore_duplicates):
+        stored = self.tables.setdefault(table, [])
+        if not conflict_columns:
+            stored.extend(dict(row) for row in rows)
+            return rows
+        keys = self._keys.setdefault(table, {})
+        written = []
+        for row in rows:
+            row_key = tuple(row[column] for column in conflict_columns)
+            if row_key in keys:
+                if not ignore_duplicates:
+                    keys[row_key].update(row)
+                    written.append(row)
+                continue
+            keys[row_key] = dict(row)
+            stored.append(keys[row_key])
+            written.append(row)
+        return written
+
+
+def seed_from_csv(client, mentee_file, mentor_file, n_mentees=None, n_mentors=None, seed=0,
+                  updated_at="2026-01-01T00:00:00"):
+    """Fill the mentees / mentors tables with database-shaped rows resampled from the CSVs."""
+    rng = np.random.default_rng(seed)
+    mentee_data, mentor_data = pd.read_csv(mentee_file), pd.read_csv(mentor_file)
+    normalize_csv_profiles(mentee_data, mentor_data)
+    if n_mentees is not None:
+        mentee_data = mentee_data.iloc[rng.integers(0, len(mentee_data), n_mentees)]
+    if n_mentors is not None:
+        mentor_data = mentor_data.iloc[rng.integers(0, len(mentor_data), n_mentors)]
+    client.tables["mentees"] = [{
+        "id": i + 1,
+        "name": row["Name"],
+        "email": f"mentee{i + 1}@example.com",
+        "age": int(row["Age"]),
+        "country": row["Country"],
+        "speaking_languages": list(row["languages"]),
+        "desired_field": row["Desired Field"],
+        "stem_skills": list(row["STEM Skills"]),
+        "interests": list(row["Interests"]),
+        "updated_at": updated_at,
+    } for i, row in enumerate(mentee_data.to_dict(orient="records"))]
+    client.tables["mentors"] = [{
+        "id": i + 1,
+        "name": row["name"],
+        "email": f"mentor{i + 1}@example.com",
+        "age": int(row["age"]),
+        "country": row["country"],
+        "speaking_language": " ".join(row["languages"]),
+        "field": row["field"],
+        "stem_skills": list(row["stem_skills"]),
+        "interests": list(row["interests"]),
+        "work_experience": row["work_experience"],
+        "updated_at": updated_at,
+    } for i, row in enumerate(mentor_data.to_dict(orient="records"))]
+    return client
@@ -0,0 +1,72 @@
+"""Lookups of mentees created after the last matcher sync, against the stub database."""
+import asyncio
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import matching_service  # noqa: E402
+from async_service import MatchingService  # noqa: E402
+from match_store import SQLiteMatchStore  # noqa: E402
+from stub_db import StubClient, seed_from_csv  # noqa: E402
+
+NEW_MENTEE_ID = 9999
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    client = StubClient()
+    seed_from_csv(client, os.path.join(ROOT, "menteedataconvergent.csv"),
+                  os.path.join(ROOT, "mentordataconvergent.csv"))
+    monkeypatch.setattr(matching_service, "get_client", lambda *args, **kwargs: client)
+    monkeypatch.setattr(matching_service, "_match_store", SQLiteMatchStore())
+    monkeypatch.setattr(matching_service, "MATCHER_CACHE_PATH", str(tmp_path / "matcher"))
+    monkeypatch.setattr(matching_service, "SYNC_INTERVAL", 3600)
+    monkeypatch.setattr(matching_service, "_matcher", None)
+    monkeypatch.setattr(matching_service, "_sync_thread", None)
+    monkeypatch.setattr(matching_service, "_last_reconcile", None)
+    matching_service.match_cache.clear()
+    return client
+
+
+def insert_mentee(client):
+    """Copy of the first mentee under a new id, changed after the seeded rows."""
+    row = dict(client.tables["mentees"][0], id=NEW_MENTEE_ID, updated_at="2099-01-01T00:00:00")
+    client.tables["mentees"].append(row)
+
+
+def test_new_mentee_is_matched_without_waiting_for_the_sync_thread(client):
+    first = client.tables["mentees"][0]["id"]
+    matching_service.find_mentors_for_mentee_api(first)
+    insert_mentee(client)
+
+    response = matching_service.find_mentors_for_mentee_api(NEW_MENTEE_ID)
+
+    assert response["mentee"]["id"] == NEW_MENTEE_ID
+    assert len(response["matches"]) == 5
+
+
+def test_unknown_mentee_still_raises_after_one_sync(client):
+    matching_service.find_mentors_for_mentee_api(client.tables["mentees"][0]["id"])
+
+    with pytest.raises(KeyError):
+        matching_service.find_mentors_for_mentee_api(NEW_MENTEE_ID)
+
+
+def test_async_service_matches_new_mentee(client):
+    async def run():
+        service = MatchingService(client, SQLiteMatchStore(), sync_interval=0)
+        await service.start(port=0)
+        try:
+            insert_mentee(client)
+            return await service.match(NEW_MENTEE_ID)
+        finally:
+            await service.stop()
+
+    result = asyncio.run(run())
+
+    assert result["mentee"]["id"] == NEW_MENTEE_ID
+    assert len(result["matches"]) == 5
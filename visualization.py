@@ -0,0 +1,102 @@
+"""
+Match charts as an opt-in, cached, off-request-path artifact.
+
+render_match_chart draws the horizontal bar chart of a mentee's matches with
+matplotlib's object-oriented API on an Agg canvas (no pyplot global state,
+no GUI backend), and matplotlib is only imported when a chart is actually
+drawn. ChartRenderer runs it in a worker process pool and caches the PNG
+bytes keyed on the match result, so repeated or concurrent requests for the
+same matches render once.
+
+API responses carry no image by default; the scores in the match list are
+enough for client-side charting.
+"""
+import collections
+import concurrent.futures
+import io
+import os
+import threading
+import time
+
+from instrumentation import metrics
+
+CHART_WORKERS = int(os.environ.get("MATCHER_CHART_WORKERS", "1"))
+CHART_CACHE_SIZE = int(os.environ.get("MATCHER_CHART_CACHE_SIZE", "256"))
+
+
+def chart_key(mentee_name, matched_mentors):
+    """Hashable key of what the chart shows: the mentee and each bar's label and rounded score."""
+    return (mentee_name, tuple((m['name'], round(float(m['match_score']), 1)) for m in matched_mentors))
+
+
+def render_match_chart(mentee_name, bars):
+    """PNG bytes of the bar chart for (name, score) bars, as returned by chart_key."""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    names = [name for name, _ in bars]
+    scores = [score for _, score in bars]
+    figure = Figure(figsize=(12, 6))
+    FigureCanvasAgg(figure)
+    axes = figure.add_subplot()
+    axes.barh(range(len(names)), scores, color='skyblue')
+    axes.set_yticks(range(len(names)), names)
+    axes.set_xlabel('Match Score (%)')
+    axes.set_title(f'Top Mentor Matches for {mentee_name}')
+    for i, score in enumerate(scores):
+        axes.text(score + 1, i, f'{score:.1f}%', va='center')
+    figure.tight_layout()
+    buffer = io.BytesIO()
+    figure.savefig(buffer, format='png')
+    return buffer.getvalue()
+
+
+class ChartRenderer:
+    """Renders match charts in a worker process pool with an LRU cache of results.
+
+    The pool is started on the first request. Cached entries are futures, so
+    a chart that is still being drawn is shared by every request asking for it.
+    """
+
+    def __init__(self, max_workers=CHART_WORKERS, cache_size=CHART_CACHE_SIZE):
+        self.max_workers = max_workers
+        self.cache_size = cache_size
+        self._cache = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def submit(self, mentee_name, matched_mentors):
+        """Future of the chart's PNG bytes."""
+        key = chart_key(mentee_name, matched_mentors)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+            if self._executor is None:
+                self._executor = concurrent.futures.ProcessPoolExecutor(self.max_workers)
+            future = self._executor.submit(render_match_chart, *key)
+            self._cache[key] = future
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        start = time.perf_counter()
+        future.add_done_callback(lambda f: self._finished(key, f, time.perf_counter() - start))
+        return future
+
+    def render(self, mentee_name, matched_mentors):
+        """The chart's PNG bytes, blocking until it is drawn."""
+        return self.submit(mentee_name, matched_mentors).result()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def _finished(self, key, future, seconds):
+        """Record the render time (queueing included); failed renders are not cached."""
+        failed = future.cancelled() or future.exception() is not None
+        if metrics.enabled:
+            metrics.observe("render", seconds, failed)
+        if failed:
+            with self._lock:
+                if self._cache.get(key) is future:
+                    del self._cache[key]